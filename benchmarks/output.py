@@ -0,0 +1,91 @@
+"""
+Messages/sec through SquidBot.process_output compared to the previous
+AsyncCodeExecutor based path.
+
+    python -m benchmarks.output [messages]
+"""
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+from jishaku.functools import AsyncSender
+from jishaku.repl import AsyncCodeExecutor
+from jishaku.repl.scope import Scope
+
+from ink.core.bot import SquidBot
+from ink.core.output import OutputDispatcher
+
+
+async def invoke(value):
+    # mirrors SquidBot.invoke for a message that isn't a command
+    if value is not None:
+        yield value
+    yield None
+
+
+async def legacy_process_output(self, ctx, coro):
+    cmd = "async for _yield in coro:\n yield _yield"
+    arg_dict = {"coro": coro}
+
+    scope = self.scope
+
+    executor = AsyncCodeExecutor(cmd, scope, arg_dict=arg_dict)
+    async for send, result in AsyncSender(executor):
+        if result is None:
+            continue
+
+        self.last_result = result
+        await self.output.dispatch(ctx, result)
+
+    scope.clear_intersection(arg_dict)
+
+
+def make_bot():
+    bot = SimpleNamespace(
+        mention_author=False,
+        color=0,
+        http=SimpleNamespace(token="token"),
+        scope=Scope(),
+        last_result=None,
+    )
+    bot.output = OutputDispatcher(bot)
+    return bot
+
+
+def make_ctx():
+    perms = SimpleNamespace(
+        send_messages=True, embed_links=False, attach_files=True, add_reactions=True
+    )
+
+    async def reply(**kwargs):
+        return None
+
+    return SimpleNamespace(
+        me=None,
+        channel=SimpleNamespace(permissions_for=lambda _: perms),
+        reply=reply,
+    )
+
+
+async def run(process_output, bot, ctx, value, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        await process_output(bot, ctx, invoke(value))
+    return n / (time.perf_counter() - start)
+
+
+async def main(n):
+    bot, ctx = make_bot(), make_ctx()
+    for label, value in (("no command", None), ("str reply", "pong")):
+        legacy = await run(legacy_process_output, bot, ctx, value, n)
+        native = await run(SquidBot.process_output, bot, ctx, value, n)
+        print(
+            f"{label:<12} legacy {legacy:>12,.0f} msg/s "
+            f"({1e6 / legacy:.1f} us)  native {native:>12,.0f} msg/s "
+            f"({1e6 / native:.1f} us)  x{native / legacy:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000))
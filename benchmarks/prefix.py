@@ -0,0 +1,107 @@
+"""
+Replays a message log through SquidBot.on_message with and without the
+prefix fast-path and reports messages/sec.
+
+    python -m benchmarks.prefix [log.txt]
+
+The log has one message per line; without one a synthetic log with ~3%
+commands is generated.
+"""
+
+import asyncio
+import random
+import string
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from ink.core.bot import SquidBot
+from ink.core.context import Context
+from ink.core.output import OutputDispatcher
+
+
+class ReplayBot(SquidBot):
+    user = SimpleNamespace(id=0)
+    cogs = {}
+
+    def __init__(self, prefix):
+        self.config = {}
+        self.command_prefix = prefix
+        self.all_commands = {}
+        self.case_insensitive = True
+        self.strip_after_prefix = False
+        self._prefix_matcher = None
+        self.output = OutputDispatcher(self)
+        self.dispatched = 0
+
+    def dispatch(self, event_name, *args, **kwargs):
+        self.dispatched += 1
+
+
+async def legacy_on_message(self, message):
+    ctx = await self.get_context(message, cls=Context)
+    self.dispatch("context", ctx)
+    coro = self.invoke(ctx)
+    if not message.author.bot:
+        await self.process_output(ctx, coro)
+
+
+def synthetic_log(n, prefix):
+    rng = random.Random(0)
+    words = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(1, 9)))
+        for _ in range(500)
+    ]
+    lines = []
+    for _ in range(n):
+        line = " ".join(rng.choices(words, k=rng.randint(1, 20)))
+        if rng.random() < 0.03:
+            line = prefix + line
+        lines.append(line)
+    return lines
+
+
+def make_messages(lines):
+    author = SimpleNamespace(id=1, bot=False)
+    channel = SimpleNamespace(id=2)
+    guild = SimpleNamespace(id=3, me=None)
+    return [
+        SimpleNamespace(
+            content=line, author=author, channel=channel, guild=guild, _state=None
+        )
+        for line in lines
+    ]
+
+
+async def replay(handler, bot, messages):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for message in messages:
+        await handler(bot, message)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(messages) / elapsed, peak
+
+
+async def main():
+    prefix = "s!"
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as fp:
+            lines = fp.read().splitlines()
+    else:
+        lines = synthetic_log(50_000, prefix)
+    messages = make_messages(lines)
+
+    bot = ReplayBot(prefix)
+    for label, handler in (
+        ("legacy", legacy_on_message),
+        ("fast-path", SquidBot.on_message),
+    ):
+        rate, peak = await replay(handler, bot, messages)
+        print(f"{label:<10} {rate:>12,.0f} msg/s  peak alloc {peak / 1024:,.0f} KiB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
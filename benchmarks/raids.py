@@ -0,0 +1,92 @@
+"""
+Synthetic join storm against the raid detector: a shard's worth of guilds
+with ordinary join traffic, then one of them gets 10,000 joins in a minute
+from fresh, default avatar accounts with generated names.
+
+    python -m benchmarks.raids [guilds] [storm joins per minute]
+
+Reports the cost per join, how many storm joins got in before the raid was
+flagged, and how many calm joins were wrongly flagged.
+"""
+
+import random
+import sys
+import time
+
+from cogs.automod.raids import CALM, RAID_STARTED, RaidDetector
+
+DISCORD_EPOCH = 1420070400
+CLOCK = 1_700_000_000.0
+NAMES = ["Alice", "bob_22", "Charlie", "dave", "EveX", "frank.w", "Gina", "h4x"]
+
+
+def snowflake(age: float) -> int:
+    return int((CLOCK - age - DISCORD_EPOCH) * 1000) << 22
+
+
+def calm_joins(rng, guilds: int, seconds: float):
+    """One join a minute per guild on average, from established accounts"""
+    now = 0.0
+    while now < seconds:
+        now += rng.expovariate(guilds / 60)
+        yield (
+            now,
+            rng.randrange(guilds),
+            snowflake(rng.uniform(30 * 86400, 5 * 365 * 86400)),
+            rng.choice(NAMES),
+            rng.random() < 0.2,
+        )
+
+
+def storm(rng, guild_id: int, start: float, per_minute: int):
+    step = 60 / per_minute
+    for i in range(per_minute):
+        yield (
+            start + i * step,
+            guild_id,
+            snowflake(rng.uniform(60, 3600)),
+            f"raider{rng.randrange(100_000)}",
+            True,
+        )
+
+
+def run(detector, joins):
+    flagged = []
+    start = time.perf_counter()
+    for now, guild_id, member_id, name, default_avatar in joins:
+        state = detector.join(
+            guild_id, member_id, name, default_avatar, now=now, clock=CLOCK
+        )
+        flagged.append(state)
+    return time.perf_counter() - start, flagged
+
+
+def main():
+    guilds = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    per_minute = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    rng = random.Random(0)
+    detector = RaidDetector()
+
+    # two hours of ordinary traffic to learn from
+    warmup = list(calm_joins(rng, guilds, 7200))
+    elapsed, flagged = run(detector, warmup)
+    false_positives = sum(state != CALM for state in flagged)
+    print(
+        f"calm: {len(warmup):,} joins over {guilds:,} guilds, "
+        f"{elapsed / len(warmup) * 1e6:.1f} us/join, "
+        f"{false_positives} flagged"
+    )
+
+    raid = list(storm(rng, 0, 7200, per_minute))
+    elapsed, flagged = run(detector, raid)
+    caught = flagged.index(RAID_STARTED) + 1 if RAID_STARTED in flagged else None
+    print(
+        f"storm: {len(raid):,} joins in 60s, {elapsed / len(raid) * 1e6:.1f} us/join "
+        f"({len(raid) / elapsed * 60:,.0f} joins/min sustainable), "
+        f"flagged on join {caught}, "
+        f"{sum(state != CALM for state in flagged):,} joins handled as raid"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compares the suffix automaton repeated_text against the substring dictionary
+it replaced, on messages from 10 to 4000 characters.
+
+    python -m benchmarks.repeats [max legacy length]
+
+Verdicts are checked to match wherever the legacy version is run; it is
+cubic in time and quadratic in memory, so by default it stops at 400
+characters and only the new engine is timed past that.
+"""
+
+import random
+import sys
+import time
+
+from cogs.automod.repeats import repeated_text
+
+SIZES = (10, 50, 100, 200, 400, 1000, 2000, 4000)
+
+
+def legacy_repeated_text(s):
+    n = len(s)
+    m = dict()
+    for i in range(n):
+        string = ""
+        for j in range(i, n):
+            string += s[j]
+            if string in m.keys():
+                m[string] += 1
+            else:
+                m[string] = 1
+
+    maxi = 0
+    maxi_str = ""
+    for i in m:
+        if m[i] > maxi:
+            maxi = m[i]
+            maxi_str = i
+        elif m[i] == maxi:
+            if len(i) > len(maxi_str):
+                maxi_str = i
+    return maxi_str
+
+
+def messages(size, rng, n=20):
+    words = ["spam", "hello", "free nitro", "lol", "@everyone", "discord.gg/abc"]
+    out = []
+    for i in range(n):
+        kind = i % 4
+        if kind == 0:  # prose
+            text = " ".join(rng.choice(words) for _ in range(size))
+        elif kind == 1:  # one unit repeated
+            text = rng.choice(words) * size
+        elif kind == 2:  # random characters
+            text = "".join(rng.choices("abcdefghijklmnopqrstuvwxyz !?", k=size))
+        else:  # a single key held down
+            text = rng.choice("aeiou") * size
+        out.append(text[:size].lower())
+    return out
+
+
+def bench(func, texts):
+    start = time.perf_counter()
+    results = [func(text) for text in texts]
+    return (time.perf_counter() - start) / len(texts), results
+
+
+def main():
+    legacy_limit = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    rng = random.Random(0)
+
+    print(f"{'chars':>6} {'legacy':>12} {'automaton':>12}  verdicts")
+    for size in SIZES:
+        texts = messages(size, rng)
+        new, results = bench(repeated_text, texts)
+
+        if size <= legacy_limit:
+            old, expected = bench(legacy_repeated_text, texts)
+            verdict = "match" if results == expected else "MISMATCH"
+            old = f"{old * 1000:,.2f} ms"
+        else:
+            old, verdict = "-", "-"
+        print(f"{size:>6} {old:>12} {new * 1000:>9,.2f} ms  {verdict}")
+
+
+if __name__ == "__main__":
+    main()
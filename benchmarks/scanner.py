@@ -0,0 +1,95 @@
+"""
+Per-message cost of the AutoMod content scan: the single-pass scanner against
+the three regexes and the per-character emoji lookup it replaced.
+
+    python -m benchmarks.scanner [log.txt]
+
+The log has one message per line; without one a synthetic mix of chat,
+links, invites and emoji is generated.
+"""
+
+import random
+import re
+import string
+import sys
+import time
+
+from emoji import UNICODE_EMOJI
+
+from cogs.automod.scanner import TLDS, scan
+
+# the old patterns, with the same TLD alternation
+_tlds = "|".join(sorted(TLDS))
+link_crazy = re.compile(
+    r"(?i)\b((?:https?:(?:/{1,3}|[a-z0-9%])|[a-z0-9.\-]+[.](?:"
+    + _tlds
+    + r")/)(?:[^\s()<>{}\[\]]+|\([^\s()]*?\([^\s()]+\)[^\s()]*?\)|\([^\s]+?\))+"
+    r"(?:\([^\s()]*?\([^\s()]+\)[^\s()]*?\)|\([^\s]+?\)|[^\s`!()\[\]{};:'"
+    + '"'
+    + r".,<>?«»“”‘’])|(?:(?<!@)[a-z0-9]+(?:[.\-][a-z0-9]+)*[.](?:"
+    + _tlds
+    + r")\b/?(?!@)))"
+)
+emoji_crazy = re.compile(
+    r"<(?P<animated>a?):(?P<name>[a-zA-Z0-9_]{2,32}):(?P<id>[0-9]{18,22})>"
+)
+invite_crazy = re.compile(
+    r"(https?://)?(www.)?(discord.(gg|io|me|li)|discordapp.com/invite)/[^\s/]+?(?=\b)"
+)
+
+
+def legacy_scan(content):
+    links = link_crazy.findall(content)
+    invites = invite_crazy.findall(content)
+    emojis = sum(1 for _ in emoji_crazy.finditer(content)) + len(
+        [i for i in content if i in UNICODE_EMOJI["en"]]
+    )
+    return links, invites, emojis
+
+
+def synthetic_log(n):
+    rng = random.Random(0)
+    words = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(1, 9)))
+        for _ in range(500)
+    ]
+    extras = [
+        "https://example.com/path?q=1",
+        "google.com",
+        "discord.gg/abcdef",
+        "<:pog:123456789012345678>",
+        "👍🏽",
+        "👨‍👩‍👧",
+        "🇺🇸",
+        "😂😂😂",
+    ]
+    lines = []
+    for _ in range(n):
+        line = rng.choices(words, k=rng.randint(1, 40))
+        if rng.random() < 0.3:
+            line.insert(rng.randrange(len(line) + 1), rng.choice(extras))
+        lines.append(" ".join(line))
+    return lines
+
+
+def bench(func, lines):
+    start = time.perf_counter()
+    for line in lines:
+        func(line)
+    return (time.perf_counter() - start) / len(lines)
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as fp:
+            lines = fp.read().splitlines()
+    else:
+        lines = synthetic_log(20_000)
+
+    for label, func in (("legacy", legacy_scan), ("scanner", scan)):
+        per = bench(func, lines)
+        print(f"{label:<8} {per * 1e6:>8.1f} µs/message {1 / per:>12,.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
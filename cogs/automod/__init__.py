@@ -0,0 +1,5 @@
+from .cog import AutoMod
+
+
+def setup(bot):
+    bot.add_cog(AutoMod(bot))
@@ -0,0 +1,141 @@
+import asyncio
+import csv
+import io
+import logging
+import time
+from collections import Counter
+from typing import List, Mapping, Tuple
+
+import discord
+
+from ink.core.context import MessageEvent
+from .counters import LocalRateCounter
+from .snapshot import CHECKS, compile_snapshot
+from .waves import WaveDetector
+
+__all__ = ("DryRun", "AuditReport", "AutoModAudit")
+
+log = logging.getLogger(__name__)
+
+# messages evaluated between yields to the event loop
+YIELD_EVERY = 256
+
+
+class DryRun:
+    """
+    Stands in for the AutoMod cog when checks are evaluated without side
+    effects: the ``check_*`` methods are bound to this object instead, so
+    the rate counters and spam wave index they use are private to it.
+    Anything else is read from the cog.
+    """
+
+    def __init__(self, cog):
+        self._cog = cog
+        self.counters = LocalRateCounter()
+        self.waves = WaveDetector(capacity=cog.waves.capacity, max_guilds=1)
+
+    def __getattr__(self, name: str):
+        attr = getattr(type(self._cog), name, None)
+        if callable(attr) and hasattr(attr, "__get__"):
+            return attr.__get__(self)
+        return getattr(self._cog, name)
+
+
+class AuditReport:
+    __slots__ = ("scanned", "hits", "offending", "errors", "elapsed")
+
+    def __init__(self):
+        self.scanned = 0
+        self.hits = Counter()
+        # (message, [(check, reason)])
+        self.offending: List[Tuple[discord.Message, List[Tuple[str, str]]]] = []
+        self.errors = 0
+        self.elapsed = 0.0
+
+    @property
+    def rate(self) -> float:
+        return self.scanned / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        order = {name: i for i, name in enumerate(CHECKS)}
+        lines = [
+            f"{name:<14}{count:>8,}"
+            for name, count in sorted(
+                self.hits.items(), key=lambda item: order.get(item[0], len(order))
+            )
+        ]
+        return "\n".join(lines) or "No check was hit"
+
+    def to_file(self, filename: str = "automod-audit.csv") -> discord.File:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(("time", "author", "checks", "link", "content"))
+        for message, failures in self.offending:
+            writer.writerow(
+                (
+                    message.created_at.isoformat(timespec="seconds"),
+                    f"{message.author} ({message.author.id})",
+                    "; ".join(f"{check}: {reason}" for check, reason in failures),
+                    message.jump_url,
+                    message.content,
+                )
+            )
+        return discord.File(io.BytesIO(buffer.getvalue().encode()), filename=filename)
+
+
+class AutoModAudit:
+    """
+    Runs a candidate AutoMod configuration over past messages through a
+    :class:`DryRun` of the cog. Messages must be fed oldest first; rate
+    limits are measured against their creation times, so the verdicts are
+    the ones AutoMod would have reached live with that configuration.
+    """
+
+    def __init__(self, cog, guild_id: int, config: Mapping):
+        self.cog = cog
+        self.dry_run = DryRun(cog)
+        self.snapshot = compile_snapshot(self.dry_run, guild_id, config)
+        self.resolves = any(rule.name == "check_links" for rule in self.snapshot.rules)
+        self.report = AuditReport()
+
+    async def feed(self, message: discord.Message) -> list:
+        """Evaluates one message and returns its ``(rule, failure)`` pairs"""
+        if message.author.bot:
+            return []
+        report = self.report
+        report.scanned += 1
+
+        ctx = MessageEvent(self.cog.bot, message)
+        run = self.snapshot.applicable(ctx)
+        try:
+            failures = await self.cog.run_checks(
+                ctx,
+                run,
+                self.dry_run.counters,
+                now=message.created_at.timestamp(),
+                # the dry run's counters are in memory, only links resolve
+                concurrent=self.resolves,
+            )
+        except Exception as exc:
+            report.errors += 1
+            log.debug("auditing message %d failed: %r", message.id, exc)
+            return []
+
+        if failures:
+            for rule, _ in failures:
+                report.hits[rule.check] += 1
+            report.offending.append(
+                (message, [(f.check, f.message) for _, f in failures])
+            )
+        return failures
+
+    async def run(self, messages) -> AuditReport:
+        start = time.perf_counter()
+        for i, message in enumerate(messages, 1):
+            await self.feed(message)
+            # without link resolution nothing above suspends, let the
+            # gateway and the live checks run between chunks
+            if i % YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+        self.report.elapsed += time.perf_counter() - start
+        return self.report
@@ -0,0 +1,245 @@
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator, Optional, Tuple
+
+__all__ = ("DomainIndex", "DomainBlocklist", "compile_index", "read_domains")
+
+log = logging.getLogger(__name__)
+
+# magic, version, entries, source mtime (ns), source size
+HEADER = struct.Struct("=4sIQqQ")
+MAGIC = b"SQBL"
+VERSION = 1
+
+# entries are bucketed by the top bits of their hash, so a lookup only
+# bisects the handful of hashes sharing its bucket
+PREFIX_BITS = 20
+PREFIX_SHIFT = 32 - PREFIX_BITS
+
+
+def _hash(domain: bytes) -> int:
+    return zlib.crc32(domain)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def normalize(host: str) -> str:
+    """``"User@Evil.COM.:443"`` -> ``"evil.com"``"""
+    host = host.rpartition("@")[2]
+    if host.startswith("["):
+        return host  # IPv6 literal
+    return host.partition(":")[0].rstrip(".").lower()
+
+
+def _encode(domain: str) -> bytes:
+    try:
+        return domain.encode("idna") if not domain.isascii() else domain.encode()
+    except UnicodeError:
+        return b""
+
+
+def read_domains(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Domains from a plain list or a hosts file (``0.0.0.0 evil.com``), one per
+    line; ``#`` starts a comment and wildcards are reduced to their base.
+    """
+    for line in lines:
+        line = line.partition("#")[0].split()
+        if not line:
+            continue
+        domain = normalize(line[-1]).lstrip("*.")
+        if "." in domain:
+            yield domain
+
+
+def compile_index(source: str, target: str) -> int:
+    """
+    Compiles the domain list ``source`` into the index file ``target``,
+    atomically replacing it, and returns the number of domains.
+
+    Layout after the header, every section 8 byte aligned: the bucket table
+    (``2^PREFIX_BITS + 1`` uint32 start positions), the sorted uint32
+    hashes, the uint64 offset of every domain in the string blob (plus its
+    end), and the blob itself.
+    """
+    stat = os.stat(source)
+    with open(source, encoding="utf-8", errors="ignore") as fp:
+        domains = sorted({_encode(d) for d in read_domains(fp)} - {b""}, key=_hash)
+
+    hashes = array("I", map(_hash, domains))
+    prefix = array("I", bytes(4 * ((1 << PREFIX_BITS) + 1)))
+    for h in hashes:
+        prefix[(h >> PREFIX_SHIFT) + 1] += 1
+    for i in range(1, len(prefix)):
+        prefix[i] += prefix[i - 1]
+
+    offsets = array("Q", [0])
+    for domain in domains:
+        offsets.append(offsets[-1] + len(domain))
+
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fp:
+        fp.write(
+            HEADER.pack(MAGIC, VERSION, len(domains), stat.st_mtime_ns, stat.st_size)
+        )
+        for section in (prefix, hashes, offsets):
+            fp.write(b"\0" * (_align(fp.tell()) - fp.tell()))
+            fp.write(section.tobytes())
+        fp.write(b"\0" * (_align(fp.tell()) - fp.tell()))
+        for domain in domains:
+            fp.write(domain)
+    os.replace(tmp, target)
+    return len(domains)
+
+
+class DomainIndex:
+    """
+    A compiled index file mapped read only. The pages live in the page cache
+    and are shared by every process mapping the same file, so a list of
+    millions of domains costs each process next to nothing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fp:
+            self._map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, mtime_ns, size = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} domain index")
+        self.count = count
+        self.source: Tuple[int, int] = (mtime_ns, size)
+
+        view = memoryview(self._map)
+        offset = _align(HEADER.size)
+        sections = []
+        for itemsize, fmt, length in (
+            (4, "I", (1 << PREFIX_BITS) + 1),
+            (4, "I", count),
+            (8, "Q", count + 1),
+        ):
+            end = offset + itemsize * length
+            sections.append(view[offset:end].cast(fmt))
+            offset = _align(end)
+        self._prefix, self._hashes, self._offsets = sections
+        self._blob = view[offset:]
+        self._views = (view, *sections, self._blob)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, domain: bytes) -> bool:
+        h = _hash(domain)
+        bucket = h >> PREFIX_SHIFT
+        hashes, hi = self._hashes, self._prefix[bucket + 1]
+        i = bisect_left(hashes, h, self._prefix[bucket], hi)
+        # crc32 collides now and then, the domain itself has the final say
+        while i < hi and hashes[i] == h:
+            offsets = self._offsets
+            if self._blob[offsets[i] : offsets[i + 1]] == domain:
+                return True
+            i += 1
+        return False
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._map.close()
+
+
+class DomainBlocklist:
+    """
+    Blocks the domains listed in ``source`` and their subdomains. The list is
+    compiled into ``source + ".idx"`` next to it, once per node: processes
+    take a file lock and the first one to find the index stale rebuilds it.
+    :meth:`reload` picks up changes to the list without a restart.
+    """
+
+    def __init__(self, source: str, index: Optional[str] = None):
+        self.source = source
+        self.index_path = index or f"{source}.idx"
+        self.index: Optional[DomainIndex] = None
+
+    def _source_stat(self) -> Tuple[int, int]:
+        stat = os.stat(self.source)
+        return stat.st_mtime_ns, stat.st_size
+
+    @property
+    def stale(self) -> bool:
+        try:
+            return self.index is None or self.index.source != self._source_stat()
+        except FileNotFoundError:
+            return False  # keep what we have until the list comes back
+
+    def _map(self, source: Tuple[int, int]) -> Optional[DomainIndex]:
+        """The index on disk, if it was compiled from this version of the list"""
+        try:
+            index = DomainIndex(self.index_path)
+        except (FileNotFoundError, ValueError):
+            return None
+        if index.source != source:
+            index.close()
+            return None
+        return index
+
+    def _open(self) -> DomainIndex:
+        """Maps the index, rebuilding it first if the list changed since"""
+        source = self._source_stat()
+        index = self._map(source)
+        if index is not None:
+            return index
+
+        with open(f"{self.index_path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # another process may have rebuilt it while we waited
+            index = self._map(source)
+            if index is None:
+                count = compile_index(self.source, self.index_path)
+                log.info("compiled %d blocked domains into %s", count, self.index_path)
+                index = DomainIndex(self.index_path)
+        return index
+
+    def load(self):
+        self._swap(self._open())
+
+    async def reload(self, loop) -> bool:
+        """Remaps the index if the list changed, compiling off the event loop"""
+        if not self.stale:
+            return False
+        self._swap(await loop.run_in_executor(None, self._open))
+        return True
+
+    def _swap(self, index: DomainIndex):
+        # lookups never await, nothing can be reading the old mapping now
+        old, self.index = self.index, index
+        if old is not None:
+            old.close()
+
+    def match(self, host: str) -> Optional[str]:
+        """The listed domain ``host`` is or is under, if any"""
+        index = self.index
+        if index is None:
+            return None
+        domain = _encode(normalize(host))
+        start = 0
+        # the host itself, then every parent short of the TLD
+        while (dot := domain.find(b".", start)) >= 0:
+            suffix = domain[start:]
+            if suffix in index:
+                return suffix.decode()
+            start = dot + 1
+        return None
+
+    def close(self):
+        if self.index is not None:
+            self.index.close()
+            self.index = None
@@ -0,0 +1,795 @@
+import asyncio
+import functools
+import hashlib
+import json
+import time
+import typing
+from collections import Counter
+import discord
+from discord.ext import commands, tasks
+from ink.core.command import squidcommand, squidgroup
+from ink.core.context import Context
+from ink.utils.db import RedisDict
+from ink.utils.resolver import DNSResolver
+from cogs.infractions.ladder import PunishmentQueue
+from .audit import AutoModAudit
+from .blocklist import DomainBlocklist
+from .counters import LocalRateCounter, RedisRateCounter, rate_check
+from .features import message_features
+from .metrics import AutoModMetrics
+from .purge import PurgeQueue
+from .raids import CALM, RAID_STARTED, RaidDetector
+from .repeats import repeated_text
+from .scanner import scan_message
+from .snapshot import CHECKS, RuleSnapshot, compile_snapshot, message_scope
+from .waves import WaveDetector
+
+
+RAID_ACTIONS = ("verification", "kick", "ban", "quarantine", "notify")
+
+
+def better_round(num: int, base: int = 5) -> int:
+    return base * round(num / base)
+
+
+def content_id(content: str) -> int:
+    # stable across processes, unlike hash()
+    digest = hashlib.blake2b(content.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") >> 1
+
+
+class AutoModCheckFailure(commands.CommandError):
+    def __init__(self, check: str, context: commands.Context, message: str):
+        self.check = check
+        self.context = context
+        self.message = message
+
+
+class AutoMod(commands.Cog):
+    def __init__(self, bot):
+        self.bot: commands.AutoShardedBot = bot
+        # compiled config per guild, see load_snapshot
+        self.snapshots = {}
+        self.snapshot_ttl = bot.config.get("automod-snapshot-ttl", 30)
+        self._storage_prefix = f"storage:{self.qualified_name}:"
+        self._watching_cache = False
+        self.log = bot.log.getChild(type(self).__name__)
+        self.metrics = AutoModMetrics(
+            max_guilds=bot.config.get("automod-metrics-guilds", 1000)
+        )
+        bot.metrics.register(self.metrics.collect)
+        self.resolver = DNSResolver(
+            bot.config.get("dns-nameservers"),
+            port=bot.config.get("dns-port", 53),
+            timeout=bot.config.get("dns-timeout", 2.0),
+        )
+        self._counters = None
+        # "local" keeps the rate counters in this process, see LocalRateCounter
+        if bot.config.get("automod-counters", "redis") == "local":
+            interval = bot.config.get("automod-reconcile-interval")
+            self._counters = LocalRateCounter(
+                maxsize=bot.config.get("automod-counters-size", 100_000),
+                reconcile=bool(interval),
+            )
+            if interval:
+                self.reconcile_loop.change_interval(seconds=interval)
+                self.reconcile_loop.start()
+        # known scam domains, compiled and memory mapped once per node
+        self.blocklist = None
+        if bot.config.get("automod-blocklist"):
+            self.blocklist = DomainBlocklist(bot.config["automod-blocklist"])
+            self.blocklist_loop.change_interval(
+                seconds=bot.config.get("automod-blocklist-interval", 60)
+            )
+            self.blocklist_loop.start()
+        # recent messages per guild for spotting the same spam from many accounts
+        self.waves = WaveDetector(
+            capacity=bot.config.get("automod-wave-capacity", 256),
+            max_guilds=bot.config.get("automod-wave-guilds", 1000),
+        )
+        self.raids = RaidDetector(
+            fast=bot.config.get("raid-window", 10.0),
+            duration=bot.config.get("raid-duration", 300.0),
+        )
+        # guild id -> (raid config or None, expires)
+        self.raid_configs = {}
+        # guild id -> verification level to restore once the raid is over
+        self.lockdowns = {}
+        self.raid_punishments = PunishmentQueue(loop=bot.loop)
+        self.purge = PurgeQueue(
+            bot,
+            window=bot.config.get("automod-purge-window", 0.5),
+            concurrency=bot.config.get("automod-purge-concurrency", 5),
+        )
+        bot.loop.create_task(self.start_purge_queue())
+
+    @property
+    def counters(self):
+        # the redis pool is only connected once the bot starts
+        if self._counters is None:
+            self._counters = RedisRateCounter(self.bot.redis)
+        return self._counters
+
+    def cog_unload(self):
+        self.bot.metrics.unregister(self.metrics.collect)
+        self.bot.loop.create_task(self.purge.stop())
+        self.reconcile_loop.cancel()
+        self.blocklist_loop.cancel()
+        if self.blocklist is not None:
+            self.blocklist.close()
+        self.bot.loop.create_task(self.raid_punishments.close())
+        if self._watching_cache:
+            self.bot.storage_cache.remove_listener(self.storage_invalidated)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.snapshots.pop(guild.id, None)
+        self.raid_configs.pop(guild.id, None)
+        self.waves.evict(guild.id)
+        self.raids.evict(guild.id)
+
+    def storage_invalidated(self, prefix: str):
+        if prefix.startswith(self._storage_prefix):
+            guild_id = int(prefix[len(self._storage_prefix) :])
+            self.snapshots.pop(guild_id, None)
+            self.raid_configs.pop(guild_id, None)
+
+    async def load_snapshot(self, ctx) -> RuleSnapshot:
+        storage = self.bot.storage(self.qualified_name, ctx.guild.id)
+
+        if storage.cached:
+            if not self._watching_cache:
+                # other processes' config writes reach us through the cache
+                self.bot.storage_cache.add_listener(self.storage_invalidated)
+                self._watching_cache = True
+            version = self.bot.storage_cache.version(storage.prefix)
+            config = await storage.to_dict()
+            snapshot = compile_snapshot(self, ctx.guild.id, config)
+            if self.bot.storage_cache.version(storage.prefix) != version:
+                return snapshot  # changed while loading, don't keep it
+        else:
+            # one HGETALL queued alongside the other listeners' reads
+            config = {
+                RedisDict._load(key): RedisDict._load(value)
+                for key, value in (
+                    await ctx.batch.read("hgetall", storage.prefix)
+                ).items()
+            }
+            # nothing tells us about writes from other processes, expire instead
+            snapshot = compile_snapshot(
+                self, ctx.guild.id, config, ttl=self.snapshot_ttl
+            )
+
+        self.snapshots[ctx.guild.id] = snapshot
+        return snapshot
+
+    @tasks.loop(seconds=1)
+    async def reconcile_loop(self):
+        try:
+            await self.counters.reconcile(self.bot.redis)
+        except Exception as exc:
+            self.log.warning("rate counter reconciliation failed: %r", exc)
+
+    @reconcile_loop.before_loop
+    async def waiter(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(seconds=60)
+    async def blocklist_loop(self):
+        # the first run loads the list, later ones pick up changes to it
+        try:
+            if await self.blocklist.reload(self.bot.loop):
+                self.log.info("loaded %d blocked domains", len(self.blocklist.index))
+        except Exception as exc:
+            self.log.warning("loading the domain blocklist failed: %r", exc)
+
+    async def start_purge_queue(self):
+        await self.bot.wait_until_ready()
+        await self.purge.start()
+
+    @squidgroup("automod", invoke_without_command=True)
+    async def automod_cmd(self, ctx, check: str, choice: bool, action: str):
+        checks = [*CHECKS, "all"]
+        if check not in checks:
+            yield "invalid choice"
+            return
+
+        if check == "all":
+            async with ctx.storage as s:
+                for i in checks:
+                    s[f"check_{i}"] = {"actions": {action: True}}
+        if choice:
+            async with ctx.storage as s:
+                s[f"check_{check}"] = {"actions": {action: True}}
+        else:
+            await ctx.storage.clear()
+        self.snapshots.pop(ctx.guild.id, None)
+        yield await ctx.storage.keys()
+
+    # Raids
+
+    async def raid_config(self, guild_id: int):
+        cached = self.raid_configs.get(guild_id)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+
+        storage = self.bot.storage(self.qualified_name, guild_id)
+        config = await storage.get("raid")
+        if not isinstance(config, dict) or not config.get("actions"):
+            config = None
+        self.raid_configs[guild_id] = (config, time.monotonic() + self.snapshot_ttl)
+        return config
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        if member.bot:
+            return
+        config = await self.raid_config(member.guild.id)
+        if config is None:
+            return
+
+        state = self.raids.join(
+            member.guild.id,
+            member.id,
+            member.name,
+            member.avatar is None,
+            min_joins=config.get("joins", 10),
+            sensitivity=config.get("sensitivity", 4.0),
+        )
+        if state == CALM:
+            return
+        actions = config["actions"]
+        if state == RAID_STARTED:
+            await self.start_lockdown(member.guild, actions)
+
+        for action in ("ban", "kick"):
+            if actions.get(action):
+                self.raid_punishments.submit(member, action, reason="Join raid")
+                break
+        else:
+            if actions.get("quarantine"):
+                self.bot.dispatch("member_quarantine", member, actions["quarantine"])
+
+    async def start_lockdown(self, guild: discord.Guild, actions: dict):
+        self.log.info("join raid in %s: %s", guild.id, self.raids.report(guild.id))
+        if (
+            actions.get("verification")
+            and guild.me.guild_permissions.manage_guild
+            and guild.id not in self.lockdowns
+        ):
+            self.lockdowns[guild.id] = guild.verification_level
+            try:
+                await guild.edit(
+                    verification_level=discord.VerificationLevel.highest,
+                    reason="Join raid",
+                )
+            except discord.HTTPException as exc:
+                self.lockdowns.pop(guild.id, None)
+                self.log.warning("locking down %s failed: %r", guild.id, exc)
+
+        await self.notify_raid(guild, actions, True)
+        self.bot.loop.call_later(
+            self.raids.duration,
+            lambda: self.bot.loop.create_task(self.end_lockdown(guild, actions)),
+        )
+
+    async def end_lockdown(self, guild: discord.Guild, actions: dict):
+        left = self.raids.report(guild.id).get("raid_left", 0)
+        if left > 0:
+            # joins over the threshold extended the raid
+            self.bot.loop.call_later(
+                left,
+                lambda: self.bot.loop.create_task(self.end_lockdown(guild, actions)),
+            )
+            return
+
+        level = self.lockdowns.pop(guild.id, None)
+        if level is not None:
+            try:
+                await guild.edit(verification_level=level, reason="Join raid over")
+            except discord.HTTPException as exc:
+                self.log.warning("lifting lockdown of %s failed: %r", guild.id, exc)
+        await self.notify_raid(guild, actions, False)
+
+    async def notify_raid(self, guild: discord.Guild, actions: dict, started: bool):
+        notify = actions.get("notify")
+        channel = guild.get_channel(notify.get("channel")) if notify else None
+        if channel is None or not channel.permissions_for(guild.me).send_messages:
+            return
+
+        if started:
+            report = self.raids.report(guild.id)
+            embed = discord.Embed(
+                color=self.bot.color,
+                title="Join raid detected",
+                description=(
+                    f"{report['joins']:.0f} joins in {report['per']:.0f}s "
+                    f"(usually {report['baseline']:.1f})\n"
+                    f"{report['young']:.0%} accounts younger than a week, "
+                    f"{report['default_avatar']:.0%} without an avatar"
+                ),
+            )
+        else:
+            embed = discord.Embed(color=self.bot.color, title="Join raid over")
+        try:
+            await channel.send(embed=embed)
+        except discord.HTTPException as exc:
+            self.log.warning("raid notification in %s failed: %r", guild.id, exc)
+
+    @squidcommand("raid")
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    async def raid_cmd(
+        self,
+        ctx,
+        action: str = None,
+        choice: bool = True,
+        target: typing.Union[discord.Role, discord.TextChannel] = None,
+    ):
+        """
+        View the join raid statistics, or toggle a lockdown action
+
+        Actions: verification, kick, ban, quarantine (with a role), notify
+        (with a channel).
+        """
+        config = await ctx.storage.get("raid") or {}
+        actions = dict(config.get("actions") or {})
+        if action is not None:
+            if action not in RAID_ACTIONS:
+                raise commands.BadArgument(
+                    f"action must be one of {', '.join(RAID_ACTIONS)}"
+                )
+            if not choice:
+                actions.pop(action, None)
+            elif action == "quarantine":
+                actions[action] = {"role": target.id} if target else {}
+            elif action == "notify":
+                actions[action] = {"channel": (target or ctx.channel).id}
+            else:
+                actions[action] = True
+            config["actions"] = actions
+            await ctx.storage.set_many({"raid": config})
+            self.raid_configs.pop(ctx.guild.id, None)
+
+        report = self.raids.report(ctx.guild.id)
+        yield discord.Embed(
+            color=self.bot.color,
+            title="Raid protection",
+            description=(
+                f"Lockdown: {', '.join(actions) or 'off'}\n"
+                + (
+                    f"Joins: {report['joins']:.1f}/{report['per']:.0f}s "
+                    f"(usually {report['baseline']:.1f})\n"
+                    f"Raid: {'%ds left' % report['raid_left'] if report['raid_left'] else 'no'}"
+                    if report
+                    else "No joins seen yet"
+                )
+            ),
+        )
+
+    @automod_cmd.command("audit")
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    @commands.max_concurrency(1, commands.BucketType.guild)
+    async def automod_audit(
+        self,
+        ctx,
+        channel: discord.TextChannel,
+        limit: int = 1000,
+        *overrides: str,
+    ):
+        """
+        Dry run AutoMod over the last messages of a channel
+
+        Overrides like `caps.percent=50` or `spam.amount=8` try out other
+        thresholds; unconfigured checks named in an override are audited too.
+        Nothing is deleted, punished or counted against anyone.
+        """
+        limit = max(1, min(limit, self.bot.config.get("automod-audit-limit", 50_000)))
+        config = await ctx.storage.to_dict()
+        for override in overrides:
+            target, _, value = override.partition("=")
+            check, _, param = target.partition(".")
+            if check not in CHECKS or not param or not value:
+                raise commands.BadArgument(
+                    f"overrides look like `check.param=value`, got `{override}`"
+                )
+            rule = config[f"check_{check}"] = dict(config.get(f"check_{check}") or {})
+            try:
+                rule[param] = json.loads(value)
+            except ValueError:
+                rule[param] = value
+
+        audit = AutoModAudit(self, ctx.guild.id, config)
+        if not audit.snapshot:
+            yield "No checks to audit, enable some or name them in an override"
+            return
+
+        fetch_start = time.perf_counter()
+        messages = [message async for message in channel.history(limit=limit)]
+        fetched = time.perf_counter() - fetch_start
+        # newest first from the API, rate limits need them in order
+        messages.reverse()
+        report = await audit.run(messages)
+
+        yield discord.Embed(
+            color=self.bot.color,
+            title=f"AutoMod audit of #{channel.name}",
+            description=(
+                f"{len(report.offending):,} of {report.scanned:,} messages "
+                f"would have been flagged\n"
+                f"```\n{report.summary()}\n```"
+                + (
+                    f"{report.errors:,} messages failed to evaluate\n"
+                    if report.errors
+                    else ""
+                )
+            ),
+        ).set_footer(
+            text=f"Fetched in {fetched:.1f}s, evaluated at {report.rate:,.0f} messages/s"
+        )
+        if report.offending:
+            yield report.to_file()
+
+    @automod_cmd.command("stats")
+    @commands.guild_only()
+    async def automod_stats(self, ctx, scope: str = "guild"):
+        """
+        How often each check runs and fires here, and what it costs
+
+        Latency is measured over every guild this process serves; use
+        `global` as the scope for process wide counts too.
+        """
+        guild_id = None if scope == "global" else ctx.guild.id
+        rows = sorted(
+            self.metrics.summary(guild_id),
+            key=lambda row: CHECKS.index(row[0]) if row[0] in CHECKS else len(CHECKS),
+        )
+        if not rows:
+            yield "No messages checked yet"
+            return
+
+        lines = [
+            f"{'check':<14}{'evals':>8}{'hits':>7}{'hit%':>6}{'bypass':>7}{'p50':>8}{'p99':>8}"
+        ]
+        for check, evaluations, hits, bypasses in rows:
+            latency = self.metrics.check(check).latency
+            lines.append(
+                f"{check:<14}{evaluations:>8,}{hits:>7,}"
+                f"{100 * hits / evaluations if evaluations else 0:>5.1f}%"
+                f"{bypasses:>7,}"
+                f"{latency.quantile(0.5) * 1e6:>6.0f}us"
+                f"{latency.quantile(0.99) * 1e6:>6.0f}us"
+            )
+        actions = Counter()
+        for stats in self.metrics.checks.values():
+            actions.update(stats.actions)
+
+        yield discord.Embed(
+            color=self.bot.color,
+            title="AutoMod stats" + (" (all guilds)" if guild_id is None else ""),
+            description="```\n"
+            + "\n".join(lines)
+            + "\n```"
+            + (
+                "Actions: " + ", ".join(f"{a} {n:,}" for a, n in actions.most_common())
+                if guild_id is None and actions
+                else ""
+            ),
+        )
+
+    async def mass_delete_handle(self, ctx: Context):
+        await self.purge.enqueue(ctx.batch, ctx.channel.id, ctx.message.id)
+
+    async def handle_checkfailure(self, error: AutoModCheckFailure, actions: dict):
+        self.log.debug(
+            "%s check failed in %d: %s",
+            error.check,
+            error.context.guild.id,
+            error.message,
+        )
+        coros = []
+        ctx = error.context
+        for action, values in actions.items():
+            self.metrics.action(error.check, action)
+            # `automod <check> true <action>` stores a bare True
+            values = values if isinstance(values, dict) else {}
+            if action == "delete":
+                if ctx.channel.permissions_for(ctx.me).manage_messages:
+                    coros.append(self.mass_delete_handle(ctx))
+                # await ctx.message.add_reaction("✅")
+                # if ctx.channel.permissions_for(ctx.me).send_messages and ctx.channel.permissions_for(ctx.me).embed_links:
+                #    coros.append(ctx.send(embed=discord.Embed(color=self.bot.color, title=f"Automod {error.check}", description='\u200b' + error.message).set_author(icon_url=ctx.author.avatar.url, name=ctx.message.content[:10] + ('...' if len(ctx.message.content) > 10 else '')), delete_after=3))
+            if action == "infraction":
+                self.bot.dispatch(
+                    "member_infraction", ctx.author, values.get("infractions", 1)
+                )
+            if action == "kick":
+                if (
+                    ctx.me.guild_permissions.kick_members
+                    and ctx.me.top_role > ctx.author.top_role
+                ):
+                    coros.append(
+                        ctx.author.kick(
+                            reason=f"Automod Check [{error.check}]:\n{error.message}"
+                        )
+                    )
+            if action == "ban":
+                if (
+                    ctx.me.guild_permissions.ban_members
+                    and ctx.me.top_role > ctx.author.top_role
+                ):
+                    coros.append(
+                        ctx.author.ban(
+                            reason=f"Automod Check [{error.check}]:\n{error.message}"
+                        )
+                    )
+            if action == "quarantine":
+                self.bot.dispatch("member_quarantine", ctx.author, values)
+        if coros:
+            for resp in await asyncio.gather(*coros, return_exceptions=True):
+                if isinstance(resp, Exception):
+                    self.log.warning("%s check action failed: %r", error.check, resp)
+
+    def validate_bypass(self, ctx: commands.Context, rule) -> bool:
+        return rule.bypassed(message_scope(ctx))
+
+    async def run_checks(
+        self, ctx, rules, counters, now=None, concurrent=True, metrics=None
+    ):
+        """
+        Evaluates ``rules`` against one message and returns the failed ones as
+        ``(rule, AutoModCheckFailure)`` pairs in rule order.
+
+        Rate limited checks only measure the message; every counter they hit
+        is then updated and read back with a single call to ``counters``.
+        Without ``concurrent`` the checks are awaited one after the other,
+        which saves a task per check when nothing they await does I/O.
+        Evaluations, their latency and hits are recorded in ``metrics``.
+        """
+        if metrics is None:
+
+            def call(rule):
+                return rule.callback(ctx, rule.params)
+
+        else:
+            call = functools.partial(self._timed_check, ctx, metrics)
+
+        if concurrent:
+            # running the checks together lets their reads share a pipeline
+            results = await asyncio.gather(
+                *[call(rule) for rule in rules], return_exceptions=True
+            )
+        else:
+            results = []
+            for rule in rules:
+                try:
+                    results.append(await call(rule))
+                except Exception as exc:
+                    results.append(exc)
+
+        failures = {}
+        hits = []
+        for rule, result in zip(rules, results):
+            if isinstance(result, AutoModCheckFailure):
+                failures[rule] = result
+            elif isinstance(result, Exception):
+                if metrics is not None:
+                    metrics.error(rule.check)
+                raise result
+            elif rule.rate is not None and result:
+                hits.append((rule, result))
+
+        if hits:
+            totals = await counters.hit(
+                ctx.guild.id,
+                ctx.author.id,
+                [(rule.rate.check, n, rule.per) for rule, n in hits],
+                now=now,
+            )
+            for (rule, _), total in zip(hits, totals):
+                if rule.exceeded(total):
+                    failures[rule] = AutoModCheckFailure(
+                        rule.rate.check,
+                        ctx,
+                        rule.rate.message.format(total=total, per=rule.per),
+                    )
+
+        if metrics is not None:
+            for rule in failures:
+                metrics.hit(ctx.guild.id, rule.check)
+        return [(rule, failures[rule]) for rule in rules if rule in failures]
+
+    @staticmethod
+    async def _timed_check(ctx, metrics, rule):
+        start = time.perf_counter()
+        try:
+            return await rule.callback(ctx, rule.params)
+        finally:
+            metrics.evaluated(ctx.guild.id, rule.check, time.perf_counter() - start)
+
+    # Checks
+
+    @rate_check(
+        "links",
+        amount=1,
+        per=5,
+        inclusive=True,
+        message="Link detected ({total}/{per}s)",
+    )
+    async def check_links(self, context: commands.Context, data: dict) -> int:
+        hosts = scan_message(context.message).hosts
+        # anything that doesn't resolve is not a link
+        resolved = await asyncio.gather(*[self.resolver.resolves(h) for h in hosts])
+        return sum(resolved)
+
+    async def check_phishing(self, context: commands.Context, data: dict):
+        if self.blocklist is None:
+            return
+        for host in scan_message(context.message).hosts:
+            domain = self.blocklist.match(host)
+            if domain is not None:
+                raise AutoModCheckFailure(
+                    "phishing", context, f"Known scam domain ({domain})"
+                )
+
+    @rate_check("invite", amount=1, per=5, inclusive=True, message="Invite")
+    async def check_invites(self, context: commands.Context, data: dict) -> int:
+        return len(set(scan_message(context.message).invites))
+
+    async def check_caps(self, context: commands.Context, data: dict):
+        percent = data.get("percent", 70)
+        features = message_features(context)
+
+        caps = features.caps_percent
+        if caps > percent and features.length > 3:
+            raise AutoModCheckFailure(
+                "caps", context, f"Excessive use of caps ({caps}%)"
+            )
+
+    async def check_zalgo(self, context: commands.Context, data: dict):
+        percent = data.get("percent", 70)
+
+        zalgo = int(100 * message_features(context).zalgo_score)
+        if zalgo > percent:
+            raise AutoModCheckFailure("zalgo", context, f"Zalgo text ({zalgo}%)")
+
+    @rate_check(
+        "newlines", amount=15, per=3, message="Too many newlines ({total}/{per}s)"
+    )
+    async def check_newlines(self, context: commands.Context, data: dict) -> int:
+        return message_features(context).newlines
+
+    @rate_check("mentions", amount=5, per=5, message="Too many mentions [{total}]")
+    async def check_mentions(self, context: commands.Context, data: dict) -> int:
+        return message_features(context).mentions
+
+    @rate_check("emojis", amount=7, per=5, message="Too many emojis [{total}]")
+    async def check_emojis(self, context: commands.Context, data: dict) -> int:
+        return message_features(context).emojis
+
+    @rate_check(
+        "spam",
+        amount=5,
+        per=3,
+        message="Sending messages too quickly ({total:,}/{per:,}s)",
+    )
+    async def check_spam(self, context: commands.Context, data: dict) -> int:
+        return 1
+
+    @rate_check(
+        "images",
+        amount=3,
+        per=8,
+        message="Sending images too quickly ({total:,}/{per:,}s)",
+    )
+    async def check_images(self, context: commands.Context, data: dict) -> int:
+        return message_features(context).attachments
+
+    async def check_repeated_text(self, context: commands.Context, data: dict):
+        amount = data.get("amount", 3)
+        per = data.get("per", 30)
+
+        # multiple messages: the same content from anyone in the guild is
+        # counted like the messages of one member
+        content = context.message.content.strip()
+        (amn,) = await self.counters.hit(
+            context.guild.id,
+            content_id(content),
+            [("repeated_text", 1, per)],
+            now=context.message.created_at.timestamp(),
+        )
+
+        c = content.lower()
+        if amn > amount:
+            t = context.message.content[:8] + ("..." if len(c) >= 8 else "")
+            raise AutoModCheckFailure(
+                "repeated_text", context, f"Repeated text [{t}] ({amn}/{per}s)"
+            )
+
+        # # single message
+
+        repeated = repeated_text(c)
+        if len(repeated.strip()) <= 1:
+            return  # useless
+
+        if repeated and (amn := c.count(repeated)) > amount:
+            t = context.message.content[:8] + (
+                "..." if len(context.message.content) >= 8 else ""
+            )
+            raise AutoModCheckFailure(
+                "repeated_text", context, f"Repeated text [{t}] ({amn}/{per}s)"
+            )
+
+    async def check_wave(self, context: commands.Context, data: dict):
+        accounts = data.get("accounts", 4)
+        per = data.get("per", 30)
+        similarity = data.get("similarity", 70)
+
+        content = context.message.content
+        if len(content) < data.get("length", 12):
+            return  # short messages are too alike to tell apart
+
+        authors = self.waves.add(
+            context.guild.id,
+            context.author.id,
+            content,
+            window=per,
+            threshold=similarity / 100,
+            now=context.message.created_at.timestamp(),
+        )
+        if len(authors) >= accounts:
+            raise AutoModCheckFailure(
+                "wave", context, f"Spam wave ({len(authors)} accounts/{per}s)"
+            )
+
+    @commands.Cog.listener("on_context")
+    async def automod(self, ctx: Context) -> None:
+        if not ctx.message.guild:
+            return
+        if ctx.message.author.bot:
+            return
+
+        snapshot = self.snapshots.get(ctx.guild.id)
+        if snapshot is None or snapshot.expired:
+            snapshot = await self.load_snapshot(ctx)
+        if not snapshot:
+            return
+
+        run = snapshot.applicable(ctx)
+        if len(run) != len(snapshot.rules):
+            self.metrics.bypassed(
+                ctx.guild.id, [r.check for r in snapshot.rules if r not in run]
+            )
+        for rule, failure in await self.run_checks(
+            ctx, run, self.counters, metrics=self.metrics
+        ):
+            await self.handle_checkfailure(failure, rule.actions)
+            break
+
+    @squidcommand("check")
+    @commands.guild_only()
+    async def checkmessage(self, ctx, message: discord.Message):
+        if message.author.bot:
+            yield "Cannot check bot messages"
+            return
+        # evaluated on its own, the real rate counters are left alone
+        audit = AutoModAudit(self, ctx.guild.id, await ctx.storage.to_dict())
+        failures = dict(await audit.feed(message))
+
+        passed = []
+        failed = []
+        for rule in audit.snapshot.rules:
+            if rule in failures:
+                failed.append((rule.name, failures[rule]))
+            else:
+                passed.append(rule.name)
+
+        yield discord.Embed(
+            title="Checks Complete",
+            description="```diff\n# Passed\n+"
+            + "\n+".join(passed)
+            + ("\n-" if failed else "")
+            + "\n-".join([f"{name}: {e.message}" for (name, e) in failed])
+            + "\n```",
+        )
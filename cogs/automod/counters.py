@@ -0,0 +1,343 @@
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+from array import array
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ink.utils.db import RedisScript
+
+__all__ = ("RateSpec", "rate_check", "RedisRateCounter", "LocalRateCounter")
+
+log = logging.getLogger(__name__)
+
+# KEYS: one sorted set per counter
+# ARGV: now (ms), token, then a (window ms, increment) pair per key
+#
+# Every hit is a member scored by its timestamp whose name ends with the
+# increment, so the window total is the sum of the members still in range.
+SLIDING_WINDOW = RedisScript(
+    """
+local now = tonumber(ARGV[1])
+local token = ARGV[2]
+local totals = {}
+for i, key in ipairs(KEYS) do
+    local window = tonumber(ARGV[1 + i * 2])
+    local increment = tonumber(ARGV[2 + i * 2])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if increment > 0 then
+        redis.call('ZADD', key, now, token .. ':' .. i .. ':' .. increment)
+    end
+    local total = 0
+    for _, member in ipairs(redis.call('ZRANGE', key, 0, -1)) do
+        total = total + tonumber(string.match(member, ':(%d+)$'))
+    end
+    redis.call('PEXPIRE', key, window)
+    totals[i] = total
+end
+return totals
+"""
+)
+
+# Same layout as SLIDING_WINDOW, with the process token as ARGV[3]; the
+# (window ms, increment) pairs start at ARGV[4]. Returns what the other
+# processes have counted, the caller already knows its own hits.
+RECONCILE = RedisScript(
+    """
+local now = tonumber(ARGV[1])
+local token = ARGV[2]
+local process = ARGV[3]
+local totals = {}
+for i, key in ipairs(KEYS) do
+    local window = tonumber(ARGV[2 + i * 2])
+    local increment = tonumber(ARGV[3 + i * 2])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if increment > 0 then
+        redis.call('ZADD', key, now, token .. ':' .. i .. ':' .. increment)
+    end
+    local total = 0
+    for _, member in ipairs(redis.call('ZRANGE', key, 0, -1)) do
+        if string.sub(member, 1, #process) ~= process then
+            total = total + tonumber(string.match(member, ':(%d+)$'))
+        end
+    end
+    redis.call('PEXPIRE', key, window)
+    totals[i] = total
+end
+return totals
+"""
+)
+
+# (counter name, increment, window in seconds)
+Hit = Tuple[str, int, float]
+
+
+class RateSpec:
+    """How a ``check_*`` method that measures a message is turned into a verdict"""
+
+    __slots__ = ("check", "amount", "per", "inclusive", "message")
+
+    def __init__(
+        self, check: str, amount: int, per: float, inclusive: bool, message: str
+    ):
+        self.check = check
+        self.amount = amount
+        self.per = per
+        self.inclusive = inclusive
+        self.message = message
+
+
+def rate_check(
+    check: str, *, amount: int, per: float, message: str, inclusive: bool = False
+):
+    """
+    Marks a check as a per-member rate limit.
+
+    The decorated check returns how much the message adds to the counter
+    (links, mentions, ...); AutoMod then updates every enabled counter of the
+    member in one call and fails the check once the total within ``per``
+    seconds goes over ``amount`` (or reaches it when ``inclusive``).
+    ``message`` is formatted with ``total`` and ``per``.
+    """
+
+    def decorator(func):
+        func.__automod_rate__ = RateSpec(check, amount, per, inclusive, message)
+        return func
+
+    return decorator
+
+
+class RedisRateCounter:
+    """
+    Sliding-window counters for every (guild, member) in Redis sorted sets.
+
+    All counters hit by a message are updated and read atomically by one
+    script call, so concurrent messages can't race and bursts straddling a
+    bucket boundary are still counted together.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self._token = uuid.uuid4().hex[:12]
+        self._seq = itertools.count()
+
+    @staticmethod
+    def key(guild_id: int, member_id: int, name: str) -> str:
+        # hash tag keeps a member's counters in one cluster slot
+        return f"automod:rate:{{{guild_id}:{member_id}}}:{name}"
+
+    async def hit(
+        self,
+        guild_id: int,
+        member_id: int,
+        hits: Sequence[Hit],
+        now: Optional[float] = None,
+    ) -> List[int]:
+        if not hits:
+            return []
+        now = time.time() if now is None else now
+
+        keys = []
+        args = [int(now * 1000), f"{self._token}-{next(self._seq)}"]
+        for name, increment, per in hits:
+            keys.append(self.key(guild_id, member_id, name))
+            args += [int(per * 1000), int(increment)]
+
+        return [int(total) for total in await SLIDING_WINDOW(self.redis, keys, args)]
+
+
+class _Window:
+    """
+    Ring of (timestamp, increment) pairs interleaved in one flat array, with
+    a running total. Starts with room for two hits and doubles up to
+    ``limit``; past that the two oldest hits are merged so the total is kept.
+    """
+
+    __slots__ = ("slots", "head", "size", "total", "limit")
+
+    def __init__(self, limit: int):
+        self.slots = array("d", bytes(32))
+        self.head = 0
+        self.size = 0
+        self.total = 0
+        self.limit = limit
+
+    def trim(self, cutoff: float):
+        slots, capacity = self.slots, len(self.slots) >> 1
+        while self.size and slots[self.head << 1] <= cutoff:
+            self.total -= int(slots[(self.head << 1) + 1])
+            self.head = (self.head + 1) % capacity
+            self.size -= 1
+
+    def add(self, now: float, increment: int):
+        capacity = len(self.slots) >> 1
+        if self.size == capacity:
+            if capacity >= self.limit:
+                # the merged hit keeps the later timestamp of the two
+                oldest, self.head = self.head, (self.head + 1) % capacity
+                self.slots[(self.head << 1) + 1] += self.slots[(oldest << 1) + 1]
+                self.size -= 1
+            else:
+                self._grow()
+                capacity <<= 1
+
+        i = ((self.head + self.size) % capacity) << 1
+        self.slots[i] = now
+        self.slots[i + 1] = increment
+        self.size += 1
+        self.total += increment
+
+    def _grow(self):
+        capacity = len(self.slots) >> 1
+        slots = array("d")
+        for n in range(self.size):
+            i = ((self.head + n) % capacity) << 1
+            slots.append(self.slots[i])
+            slots.append(self.slots[i + 1])
+        # pairs of doubles, twice the room but never more than the limit
+        slots.frombytes(bytes(16 * min(capacity << 1, self.limit) - 8 * len(slots)))
+        self.slots, self.head = slots, 0
+
+
+class _Member:
+    __slots__ = ("windows", "remote", "expires")
+
+    def __init__(self):
+        self.windows: Dict[str, _Window] = {}
+        # counter name -> (total seen by other processes, valid until)
+        self.remote: Optional[Dict[str, Tuple[int, float]]] = None
+        self.expires = 0.0
+
+
+class LocalRateCounter:
+    """
+    In-process sliding-window counters with the same ``hit`` interface as
+    :class:`RedisRateCounter`.
+
+    Members are kept in LRU order and dropped once all of their windows have
+    run out or when more than ``maxsize`` are tracked, so memory stays
+    bounded no matter how many members are active.
+
+    When several processes share guilds, :meth:`reconcile` pushes the hits
+    counted since the last call into the same sorted sets
+    :class:`RedisRateCounter` uses and remembers what the other processes
+    counted, which is added to the local totals until the window runs out.
+    """
+
+    def __init__(
+        self, maxsize: int = 100_000, window_size: int = 64, reconcile: bool = False
+    ):
+        self.maxsize = maxsize
+        self.window_size = window_size
+        self._entries: "OrderedDict[Tuple[int, int], _Member]" = OrderedDict()
+        # hits not yet merged into Redis, only tracked when reconciling
+        self._pending: Optional[Dict[Tuple[int, int, str, float], int]] = (
+            defaultdict(int) if reconcile else None
+        )
+        self._token = uuid.uuid4().hex[:12]
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def hit(
+        self,
+        guild_id: int,
+        member_id: int,
+        hits: Sequence[Hit],
+        now: Optional[float] = None,
+    ) -> List[int]:
+        if not hits:
+            return []
+        now = time.time() if now is None else now
+
+        key = (guild_id, member_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Member()
+        else:
+            self._entries.move_to_end(key)
+
+        totals = []
+        for name, increment, per in hits:
+            window = entry.windows.get(name)
+            if window is None:
+                window = entry.windows[name] = _Window(self.window_size)
+            window.trim(now - per)
+            if increment:
+                window.add(now, increment)
+                if self._pending is not None:
+                    self._pending[guild_id, member_id, name, per] += increment
+
+            total = window.total
+            remote = entry.remote and entry.remote.get(name)
+            if remote is not None:
+                if remote[1] > now:
+                    total += remote[0]
+                else:
+                    del entry.remote[name]
+            totals.append(total)
+
+            if now + per > entry.expires:
+                entry.expires = now + per
+
+        self._evict(now)
+        return totals
+
+    def _evict(self, now: float):
+        entries = self._entries
+        while entries:
+            oldest = next(iter(entries.values()))
+            if len(entries) <= self.maxsize and oldest.expires > now:
+                break
+            entries.popitem(last=False)
+
+    async def reconcile(self, redis, now: Optional[float] = None, chunk: int = 500):
+        """Merges the hits since the last call into Redis, one script call per member"""
+        if not self._pending:
+            return
+        now = time.time() if now is None else now
+        pending, self._pending = self._pending, defaultdict(int)
+
+        members = defaultdict(list)
+        for (guild_id, member_id, name, per), increment in pending.items():
+            members[guild_id, member_id].append((name, increment, per))
+
+        async def merge(guild_id, member_id, hits):
+            keys = []
+            args = [int(now * 1000), f"{self._token}-{next(self._seq)}", self._token]
+            for name, increment, per in hits:
+                keys.append(RedisRateCounter.key(guild_id, member_id, name))
+                args += [int(per * 1000), int(increment)]
+
+            totals = await RECONCILE(redis, keys, args)
+            entry = self._entries.get((guild_id, member_id))
+            if entry is None:
+                return
+            if entry.remote is None:
+                entry.remote = {}
+            for (name, _, per), total in zip(hits, totals):
+                entry.remote[name] = (int(total), now + per)
+
+        items = list(members.items())
+        failed = []
+        for i in range(0, len(items), chunk):
+            batch = items[i : i + chunk]
+            results = await asyncio.gather(
+                *[merge(g, m, hits) for (g, m), hits in batch],
+                return_exceptions=True,
+            )
+            for ((guild_id, member_id), hits), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    # kept for the next call rather than lost
+                    for name, increment, per in hits:
+                        self._pending[guild_id, member_id, name, per] += increment
+                    failed.append(result)
+        if failed:
+            log.warning(
+                "reconciling rate counters of %d members failed: %r",
+                len(failed),
+                failed[0],
+            )
@@ -0,0 +1,142 @@
+import unicodedata
+from typing import Tuple
+
+from .scanner import scan_message
+
+__all__ = ("MessageFeatures", "message_features")
+
+# one class character per content character, see _ClassTable
+UPPER = "U"
+LOWER = "l"
+MARK = "M"
+SPACE = " "
+NEWLINE = "\n"
+OTHER = "."
+
+# combining marks stacked on letters are what zalgo text is made of
+ZALGO_CATEGORIES = frozenset(("Mn", "Me"))
+
+
+def _classify(codepoint: int) -> str:
+    ch = chr(codepoint)
+    if ch == "\n":
+        return NEWLINE
+    if ch.isspace():
+        return SPACE
+    if ch.isupper():
+        return UPPER
+    if ch.islower():
+        return LOWER
+    if unicodedata.category(ch) in ZALGO_CATEGORIES:
+        return MARK
+    return OTHER
+
+
+# Latin, Greek and Cyrillic, and the combining mark blocks zalgo is built from
+PRECOMPUTED = (
+    range(0x0000, 0x0530),
+    range(0x1AB0, 0x1B00),
+    range(0x1DC0, 0x1E00),
+    range(0x20D0, 0x2100),
+    range(0xFE20, 0xFE30),
+)
+
+
+class _ClassTable(dict):
+    """
+    ``str.translate`` table mapping every character to its class character.
+    The scripts and mark blocks in ``PRECOMPUTED`` are filled in up front;
+    anything else is remembered the first time it is seen, up to ``limit``
+    more characters, and classified on every lookup after that so hostile
+    input can't grow the table.
+    """
+
+    def __init__(self, limit: int = 4096):
+        super().__init__(
+            (codepoint, _classify(codepoint))
+            for block in PRECOMPUTED
+            for codepoint in block
+        )
+        self.size = len(self) + limit
+
+    def __missing__(self, codepoint: int) -> str:
+        cls = _classify(codepoint)
+        if len(self) < self.size:
+            self[codepoint] = cls
+        return cls
+
+
+_CLASSES = _ClassTable()
+
+
+def _percentile(values, q: float) -> float:
+    # linear interpolation between the closest ranks, like numpy.percentile
+    values = sorted(values)
+    rank = (len(values) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+class MessageFeatures:
+    """
+    Everything the content based AutoMod checks measure, computed once per
+    message: the content is translated into one class character per
+    character in a single pass and the counts are taken from that.
+    """
+
+    __slots__ = (
+        "length",
+        "upper",
+        "lower",
+        "newlines",
+        "mark_ratios",
+        "emojis",
+        "mentions",
+        "attachments",
+    )
+
+    def __init__(self, message):
+        content = message.content
+        classes = content.translate(_CLASSES)
+
+        self.length = len(content)
+        self.upper = classes.count(UPPER)
+        self.lower = classes.count(LOWER)
+        # surrounding newlines don't make a message any taller
+        self.newlines = classes.strip().count(NEWLINE)
+        # share of combining marks in every word
+        self.mark_ratios: Tuple[float, ...] = tuple(
+            word.count(MARK) / len(word) for word in classes.split()
+        )
+
+        self.emojis = scan_message(message).emoji_count
+        self.mentions = len(message.mentions)
+        self.attachments = len(message.attachments)
+
+    @property
+    def caps_percent(self) -> int:
+        if not self.length:
+            return 0
+        return int(100 * self.upper / self.length)
+
+    @property
+    def zalgo_score(self) -> float:
+        """Share of combining marks in the 75th percentile word"""
+        if not self.mark_ratios:
+            return 0.0
+        return _percentile(self.mark_ratios, 75)
+
+    def __repr__(self) -> str:
+        return (
+            f"<MessageFeatures length={self.length} caps={self.caps_percent}% "
+            f"newlines={self.newlines} zalgo={self.zalgo_score:.2f}>"
+        )
+
+
+def message_features(ctx) -> MessageFeatures:
+    """The features of ``ctx.message``, shared by every check through ``ctx``"""
+    features = ctx._features
+    if features is None:
+        features = ctx._features = MessageFeatures(ctx.message)
+    return features
@@ -0,0 +1,159 @@
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from ink.utils.metrics import Histogram, format_labels
+
+__all__ = ("CheckStats", "AutoModMetrics")
+
+
+class CheckStats:
+    __slots__ = ("evaluations", "hits", "bypasses", "errors", "latency", "actions")
+
+    def __init__(self):
+        self.evaluations = 0
+        self.hits = 0
+        self.bypasses = 0
+        self.errors = 0
+        self.latency = Histogram()
+        self.actions: Counter = Counter()
+
+
+class _GuildStats:
+    """Per check [evaluations, hits, bypasses] of one guild"""
+
+    __slots__ = ("checks",)
+
+    def __init__(self):
+        self.checks: Dict[str, List[int]] = {}
+
+    def get(self, check: str) -> List[int]:
+        counts = self.checks.get(check)
+        if counts is None:
+            counts = self.checks[check] = [0, 0, 0]
+        return counts
+
+
+class AutoModMetrics:
+    """
+    What every check costs and catches. Latency histograms, evaluations,
+    hits, bypasses, errors and actions are kept per check for the whole
+    process. Per guild only the counts are kept, for the ``max_guilds`` most
+    recently active guilds, and only the ``exported_guilds`` noisiest get
+    series of their own; everything else is summed up as ``"other"`` so
+    totals stay right while the number of series stays bounded.
+    """
+
+    def __init__(self, max_guilds: int = 1000, exported_guilds: int = 20):
+        self.max_guilds = max_guilds
+        self.exported_guilds = exported_guilds
+        self.checks: Dict[str, CheckStats] = {}
+        self.guilds: "OrderedDict[int, _GuildStats]" = OrderedDict()
+        # what the evicted guilds counted
+        self.other = _GuildStats()
+        self.started = time.time()
+
+    def check(self, name: str) -> CheckStats:
+        stats = self.checks.get(name)
+        if stats is None:
+            stats = self.checks[name] = CheckStats()
+        return stats
+
+    def guild(self, guild_id: int) -> _GuildStats:
+        stats = self.guilds.get(guild_id)
+        if stats is not None:
+            self.guilds.move_to_end(guild_id)
+            return stats
+
+        stats = self.guilds[guild_id] = _GuildStats()
+        if len(self.guilds) > self.max_guilds:
+            _, evicted = self.guilds.popitem(last=False)
+            for check, counts in evicted.checks.items():
+                total = self.other.get(check)
+                for i, n in enumerate(counts):
+                    total[i] += n
+        return stats
+
+    # recording, called from the message path
+
+    def evaluated(self, guild_id: int, check: str, seconds: float):
+        stats = self.check(check)
+        stats.evaluations += 1
+        stats.latency.observe(seconds)
+        self.guild(guild_id).get(check)[0] += 1
+
+    def hit(self, guild_id: int, check: str):
+        self.check(check).hits += 1
+        self.guild(guild_id).get(check)[1] += 1
+
+    def bypassed(self, guild_id: int, checks: Iterable[str]):
+        guild = self.guild(guild_id)
+        for check in checks:
+            self.check(check).bypasses += 1
+            guild.get(check)[2] += 1
+
+    def error(self, check: str):
+        self.check(check).errors += 1
+
+    def action(self, check: str, action: str):
+        self.check(check).actions[action] += 1
+
+    # reading
+
+    def summary(self, guild_id: int = None) -> Iterator[Tuple[str, int, int, int]]:
+        """``(check, evaluations, hits, bypasses)`` for a guild or everywhere"""
+        if guild_id is None:
+            for name, stats in self.checks.items():
+                yield name, stats.evaluations, stats.hits, stats.bypasses
+            return
+        guild = self.guilds.get(guild_id)
+        if guild is not None:
+            for name, counts in guild.checks.items():
+                yield (name, *counts)
+
+    def collect(self) -> Iterator[str]:
+        """Prometheus text exposition of everything above"""
+        counters = (
+            ("evaluations", "Messages an AutoMod check was evaluated on"),
+            ("hits", "Messages an AutoMod check flagged"),
+            ("bypasses", "Messages exempt from an AutoMod check"),
+            ("errors", "AutoMod check evaluations that raised"),
+        )
+        for field, help in counters:
+            name = f"automod_check_{field}_total"
+            yield f"# HELP {name} {help}"
+            yield f"# TYPE {name} counter"
+            for check, stats in self.checks.items():
+                yield f"{name}{format_labels({'check': check})} {getattr(stats, field)}"
+
+        yield "# HELP automod_check_seconds Time spent evaluating an AutoMod check"
+        yield "# TYPE automod_check_seconds histogram"
+        for check, stats in self.checks.items():
+            yield from stats.latency.render("automod_check_seconds", {"check": check})
+
+        yield "# HELP automod_actions_total Actions taken on AutoMod hits"
+        yield "# TYPE automod_actions_total counter"
+        for check, stats in self.checks.items():
+            for action, n in stats.actions.items():
+                labels = format_labels({"check": check, "action": action})
+                yield f"automod_actions_total{labels} {n}"
+
+        totals = {
+            guild_id: sum(counts[1] for counts in stats.checks.values())
+            for guild_id, stats in self.guilds.items()
+        }
+        top = sorted(totals, key=totals.get, reverse=True)[: self.exported_guilds]
+        # the rest are summed up so the series still add up to the total
+        rest = _GuildStats()
+        for stats in (self.other, *(self.guilds[g] for g in totals if g not in top)):
+            for check, counts in stats.checks.items():
+                rest.get(check)[1] += counts[1]
+
+        # guilds move in and out of the top and "other" with them, so these
+        # series can go down: a gauge, not a counter
+        yield "# HELP automod_guild_hits Messages AutoMod flagged in the noisiest guilds"
+        yield "# TYPE automod_guild_hits gauge"
+        for guild_id, stats in (*((g, self.guilds[g]) for g in top), ("other", rest)):
+            for check, counts in stats.checks.items():
+                labels = format_labels({"guild": guild_id, "check": check})
+                yield f"automod_guild_hits{labels} {counts[1]}"
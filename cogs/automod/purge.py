@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+import socket
+from collections import defaultdict
+from typing import Dict, List, Set
+
+import aioredis
+import discord
+
+__all__ = ("PurgeQueue",)
+
+log = logging.getLogger(__name__)
+
+
+class PurgeQueue:
+    """
+    Deletes messages AutoMod flagged, in bulk, from a Redis stream that every
+    replica of the bot consumes as one group.
+
+    Each entry is delivered to one consumer, which collects the message ids
+    of a channel for ``window`` seconds and deletes them 100 at a time. A
+    channel only ever has one delete in flight (discord.py waits out its rate
+    limit) while up to ``concurrency`` channels are purged at once.
+
+    Entries are acknowledged only once their messages are gone, so a
+    replica dying mid-purge leaves them pending; any consumer claims entries
+    that have been pending for ``claim_idle`` seconds. Deleting an already
+    deleted message is treated as done, so a claimed entry is never a
+    second deletion.
+    """
+
+    STREAM = "automod:purge"
+    GROUP = "automod:purgers"
+
+    def __init__(
+        self,
+        bot,
+        *,
+        window: float = 0.5,
+        concurrency: int = 5,
+        claim_idle: float = 60.0,
+        max_len: int = 100_000,
+    ):
+        self.bot = bot
+        self.window = window
+        self.claim_idle = claim_idle
+        self.max_len = max_len
+        self.consumer = f"{socket.gethostname()}:{os.getpid()}"
+
+        # channel id -> {message id: stream entry ids}
+        self._pending: Dict[int, Dict[int, List[str]]] = defaultdict(dict)
+        self._scheduled: Set[int] = set()
+        self._locks: Dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: List[asyncio.Task] = []
+
+    def enqueue(self, batch, channel_id: int, message_id: int) -> asyncio.Future:
+        """Queues a message for deletion through a :class:`RedisBatch`"""
+        return batch.write(
+            "xadd",
+            self.STREAM,
+            {"channel": channel_id, "message": message_id},
+            max_len=self.max_len,
+        )
+
+    async def start(self):
+        redis = self.bot.redis
+        try:
+            await redis.xgroup_create(
+                self.STREAM, self.GROUP, latest_id="0", mkstream=True
+            )
+        except aioredis.ReplyError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+        loop = self.bot.loop
+        self._tasks = [
+            loop.create_task(self._reader()),
+            loop.create_task(self._claimer()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def _reader(self):
+        while True:
+            try:
+                # blocking reads get a connection of their own
+                with await self.bot.redis.exclusive() as conn:
+                    while True:
+                        entries = await conn.xread_group(
+                            self.GROUP,
+                            self.consumer,
+                            [self.STREAM],
+                            timeout=2000,
+                            count=1000,
+                            latest_ids=[">"],
+                        )
+                        self._collect(
+                            (entry_id, fields) for _, entry_id, fields in entries
+                        )
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                log.warning("purge queue read failed: %r", exc)
+                await asyncio.sleep(1)
+
+    async def _claimer(self):
+        idle = int(self.claim_idle * 1000)
+        while True:
+            await asyncio.sleep(self.claim_idle / 2)
+            try:
+                pending = await self.bot.redis.xpending(
+                    self.STREAM, self.GROUP, "-", "+", 1000
+                )
+                # includes our own entries whose delete failed
+                stale = [entry[0] for entry in pending if entry[2] >= idle]
+                if stale:
+                    claimed = await self.bot.redis.xclaim(
+                        self.STREAM, self.GROUP, self.consumer, idle, *stale
+                    )
+                    log.info("claimed %d stale purge entries", len(claimed))
+                    self._collect(claimed)
+                    # entries already trimmed by max_len come back as nil and
+                    # are dropped from the reply, but stay pending until acked
+                    trimmed = set(stale).difference(entry_id for entry_id, _ in claimed)
+                    if trimmed:
+                        await self.bot.redis.xack(self.STREAM, self.GROUP, *trimmed)
+                        log.info("acked %d trimmed purge entries", len(trimmed))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                log.warning("purge queue claim failed: %r", exc)
+
+    def _collect(self, entries):
+        for entry_id, fields in entries:
+            channel_id, message_id = int(fields["channel"]), int(fields["message"])
+            entry_ids = self._pending[channel_id].setdefault(message_id, [])
+            if entry_id not in entry_ids:
+                entry_ids.append(entry_id)
+
+            if channel_id not in self._scheduled:
+                self._scheduled.add(channel_id)
+                self.bot.loop.call_later(
+                    self.window,
+                    lambda c=channel_id: self.bot.loop.create_task(self._purge(c)),
+                )
+
+    async def _purge(self, channel_id: int):
+        async with self._semaphore, self._locks[channel_id]:
+            self._scheduled.discard(channel_id)
+            pending = self._pending.pop(channel_id, {})
+            messages = list(pending.items())
+
+            for i in range(0, len(messages), 100):
+                chunk = messages[i : i + 100]
+                if await self._delete(channel_id, [m for m, _ in chunk]):
+                    entry_ids = [e for _, ids in chunk for e in ids]
+                    await self.bot.redis.xack(self.STREAM, self.GROUP, *entry_ids)
+
+        if channel_id not in self._scheduled:
+            self._locks.pop(channel_id, None)
+
+    async def _delete(self, channel_id: int, message_ids: List[int]) -> bool:
+        """Returns whether the entries are done with"""
+        http = self.bot.http
+        try:
+            if len(message_ids) == 1:
+                await http.delete_message(channel_id, message_ids[0])
+            else:
+                await http.delete_messages(channel_id, message_ids)
+        except (discord.NotFound, discord.Forbidden):
+            # already gone, or never will be
+            return True
+        except discord.HTTPException as exc:
+            log.warning(
+                "purging %d messages in %d failed: %r",
+                len(message_ids),
+                channel_id,
+                exc,
+            )
+            # client errors (e.g. messages older than two weeks) won't go away,
+            # anything else is left pending to be claimed and retried
+            return exc.status < 500
+        return True
@@ -0,0 +1,271 @@
+import math
+import re
+import time
+from array import array
+from bisect import bisect
+from collections import OrderedDict
+from typing import List, Optional
+
+__all__ = ("CALM", "RAID", "RAID_STARTED", "JoinStats", "RaidDetector", "name_shape")
+
+CALM = 0
+RAID = 1
+RAID_STARTED = 2
+
+# upper bounds of the account age buckets in seconds, the last one is open
+AGE_BUCKETS = (3600, 86400, 7 * 86400, 30 * 86400, 365 * 86400)
+# the buckets below a week are young accounts
+YOUNG_BUCKETS = 3
+SHAPES = 64
+
+# counter layout, the same for both windows
+TOTAL = 0
+DEFAULT_AVATAR = 1
+AGE = 2
+SHAPE = AGE + len(AGE_BUCKETS) + 1
+COUNTERS = SHAPE + SHAPES
+
+DISCORD_EPOCH = 1420070400
+
+_RUNS = re.compile(r"(.)\1+")
+# Latin, Greek and Cyrillic, what nearly every name is written in
+PRECOMPUTED = range(0x0530)
+
+
+def _shape(codepoint: int) -> str:
+    ch = chr(codepoint)
+    if ch.isdigit():
+        return "0"
+    if ch.isupper():
+        return "A"
+    if ch.isalpha():
+        return "a"
+    return "_"
+
+
+class _ShapeTable(dict):
+    """
+    ``str.translate`` table reducing a name to its character classes. The
+    first ``PRECOMPUTED`` codepoints are filled in up front; up to ``limit``
+    others are remembered as they're seen, after which they're classified
+    on every lookup so hostile names can't grow the table.
+    """
+
+    def __init__(self, limit: int = 4096):
+        super().__init__((codepoint, _shape(codepoint)) for codepoint in PRECOMPUTED)
+        self.size = len(self) + limit
+
+    def __missing__(self, codepoint: int) -> str:
+        cls = _shape(codepoint)
+        if len(self) < self.size:
+            self[codepoint] = cls
+        return cls
+
+
+_SHAPE_TABLE = _ShapeTable()
+
+
+def name_shape(name: str) -> str:
+    """``"xXkiller420Xx"`` -> ``"aAa0Aa"``: bot farms name accounts alike"""
+    return _RUNS.sub(r"\1", name.translate(_SHAPE_TABLE))
+
+
+def account_age(user_id: int, now: float) -> float:
+    return now - ((user_id >> 22) / 1000 + DISCORD_EPOCH)
+
+
+class _Window:
+    """
+    Exponentially decayed counters over a time constant ``tau``, updated in
+    O(1): instead of decaying every counter on every join, new joins are
+    weighted by ``e^((t - epoch) / tau)`` and the counters are scaled back
+    down only when reading them (or once the weights grow too large).
+    """
+
+    __slots__ = ("tau", "epoch", "counts")
+
+    def __init__(self, tau: float, now: float):
+        self.tau = tau
+        self.epoch = now
+        self.counts = array("d", bytes(8 * COUNTERS))
+
+    def weight(self, now: float) -> float:
+        exponent = (now - self.epoch) / self.tau
+        if exponent > 50:
+            scale = math.exp(-exponent)
+            counts = self.counts
+            for i in range(COUNTERS):
+                counts[i] *= scale
+            self.epoch = now
+            exponent = 0.0
+        return math.exp(exponent)
+
+    def add(self, now: float, age: int, default_avatar: bool, shape: int):
+        weight = self.weight(now)
+        counts = self.counts
+        counts[TOTAL] += weight
+        counts[AGE + age] += weight
+        if default_avatar:
+            counts[DEFAULT_AVATAR] += weight
+        counts[SHAPE + shape] += weight
+
+    def get(self, index: int, now: float) -> float:
+        """The decayed count, about the joins in the last ``tau`` seconds"""
+        return self.counts[index] / self.weight(now)
+
+    def share(self, index: int) -> float:
+        total = self.counts[TOTAL]
+        return self.counts[index] / total if total else 0.0
+
+    def young(self) -> float:
+        total = self.counts[TOTAL]
+        if not total:
+            return 0.0
+        return sum(self.counts[AGE : AGE + YOUNG_BUCKETS]) / total
+
+    def ages(self) -> List[float]:
+        """The account age histogram, as shares of the joins"""
+        return [self.share(AGE + i) for i in range(len(AGE_BUCKETS) + 1)]
+
+
+class JoinStats:
+    """
+    Streaming join statistics of one guild, in constant memory: a fast
+    window measuring the current join rate and the make up of the recent
+    joins, and a slow one learning what normal looks like.
+    """
+
+    __slots__ = ("fast", "slow", "raid_until")
+
+    def __init__(self, fast: float, slow: float, now: float):
+        self.fast = _Window(fast, now)
+        self.slow = _Window(slow, now)
+        self.raid_until = 0.0
+
+    def suspicion(self, shape: int) -> float:
+        """
+        How much the recent joins stand out from normal, from 0 to 1: the
+        largest excess share of young accounts, default avatars or the
+        newest join's name shape over the baseline.
+        """
+        fast, slow = self.fast, self.slow
+        if not slow.counts[TOTAL]:
+            # nothing learnt yet, only judge the join rate
+            return 0.0
+        return max(
+            0.0,
+            fast.young() - slow.young(),
+            fast.share(DEFAULT_AVATAR) - slow.share(DEFAULT_AVATAR),
+            fast.share(SHAPE + shape) - slow.share(SHAPE + shape),
+        )
+
+    def threshold(self, now: float, min_joins: float, sensitivity: float) -> float:
+        """
+        Joins within the fast window that make a raid: ``sensitivity``
+        standard deviations above the baseline rate (treated as Poisson),
+        and never below ``min_joins``.
+        """
+        expected = self.slow.get(TOTAL, now) * self.fast.tau / self.slow.tau
+        return max(min_joins, expected + sensitivity * math.sqrt(expected))
+
+
+class RaidDetector:
+    """
+    Flags join raids per guild. A guild is raided while its recent join
+    count is above an adaptive threshold, lowered by up to half when the
+    joins look alike (young accounts, default avatars, similarly shaped
+    names), and stays raided for ``duration`` seconds after the last join
+    over it. Joins during a raid don't teach the baseline.
+
+    At most ``max_guilds`` guilds are tracked, least recently joined first
+    out, each in about 1 KiB.
+    """
+
+    def __init__(
+        self,
+        *,
+        fast: float = 10.0,
+        slow: float = 3600.0,
+        duration: float = 300.0,
+        max_guilds: int = 10_000,
+    ):
+        self.fast = fast
+        self.slow = slow
+        self.duration = duration
+        self.max_guilds = max_guilds
+        self._guilds: "OrderedDict[int, JoinStats]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._guilds)
+
+    def get(self, guild_id: int) -> Optional[JoinStats]:
+        return self._guilds.get(guild_id)
+
+    def join(
+        self,
+        guild_id: int,
+        member_id: int,
+        name: str,
+        default_avatar: bool,
+        *,
+        min_joins: float = 10,
+        sensitivity: float = 4.0,
+        now: Optional[float] = None,
+        clock: Optional[float] = None,
+    ) -> int:
+        """
+        Records a join and returns :data:`CALM`, :data:`RAID` or
+        :data:`RAID_STARTED`. ``now`` is monotonic, ``clock`` the wall clock
+        the account age is measured against.
+        """
+        now = time.monotonic() if now is None else now
+        clock = time.time() if clock is None else clock
+
+        stats = self._guilds.get(guild_id)
+        if stats is None:
+            stats = self._guilds[guild_id] = JoinStats(self.fast, self.slow, now)
+            if len(self._guilds) > self.max_guilds:
+                self._guilds.popitem(last=False)
+        else:
+            self._guilds.move_to_end(guild_id)
+
+        age = bisect(AGE_BUCKETS, account_age(member_id, clock))
+        shape = hash(name_shape(name)) % SHAPES
+        stats.fast.add(now, age, default_avatar, shape)
+
+        raiding = stats.raid_until > now
+        limit = stats.threshold(now, min_joins, sensitivity)
+        limit *= 1 - stats.suspicion(shape) / 2
+        if stats.fast.get(TOTAL, now) > limit:
+            stats.raid_until = now + self.duration
+            return RAID if raiding else RAID_STARTED
+
+        if raiding:
+            return RAID
+        stats.slow.add(now, age, default_avatar, shape)
+        return CALM
+
+    def raiding(self, guild_id: int, now: Optional[float] = None) -> bool:
+        stats = self._guilds.get(guild_id)
+        now = time.monotonic() if now is None else now
+        return stats is not None and stats.raid_until > now
+
+    def report(self, guild_id: int, now: Optional[float] = None) -> dict:
+        """The guild's current statistics, for humans"""
+        stats = self._guilds.get(guild_id)
+        if stats is None:
+            return {}
+        now = time.monotonic() if now is None else now
+        fast, slow = stats.fast, stats.slow
+        return {
+            "joins": fast.get(TOTAL, now),
+            "per": fast.tau,
+            "baseline": slow.get(TOTAL, now) * fast.tau / slow.tau,
+            "young": fast.young(),
+            "ages": fast.ages(),
+            "default_avatar": fast.share(DEFAULT_AVATAR),
+            "raid_left": max(0.0, stats.raid_until - now),
+        }
+
+    def evict(self, guild_id: int):
+        self._guilds.pop(guild_id, None)
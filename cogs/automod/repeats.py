@@ -0,0 +1,82 @@
+from typing import List
+
+__all__ = ("MAX_REPEATED_TEXT", "repeated_text")
+
+# Discord's message limit with nitro, anything past it is ignored
+MAX_REPEATED_TEXT = 4000
+
+
+def repeated_text(s: str, limit: int = MAX_REPEATED_TEXT) -> str:
+    """
+    Returns the substring of ``s`` that occurs most often (overlapping
+    occurrences count), preferring the longest one and then the one that
+    occurs first.
+
+    Builds a suffix automaton of ``s[:limit]``: every state is a set of
+    substrings that end at the same positions, so its occurrence count is the
+    size of that set and its longest member is the best candidate. Linear in
+    the length of the input instead of enumerating all O(n²) substrings.
+    """
+    s = s[:limit]
+    if not s:
+        return ""
+
+    # per state: longest length, suffix link, transitions, end of the
+    # first occurrence and number of occurrences
+    length: List[int] = [0]
+    link: List[int] = [-1]
+    edges: List[dict] = [{}]
+    first: List[int] = [-1]
+    count: List[int] = [0]
+
+    last = 0
+    for i, ch in enumerate(s):
+        cur = len(length)
+        length.append(length[last] + 1)
+        link.append(0)
+        edges.append({})
+        first.append(i)
+        count.append(1)
+
+        p = last
+        while p != -1 and ch not in edges[p]:
+            edges[p][ch] = cur
+            p = link[p]
+
+        if p != -1:
+            q = edges[p][ch]
+            if length[p] + 1 == length[q]:
+                link[cur] = q
+            else:
+                clone = len(length)
+                length.append(length[p] + 1)
+                link.append(link[q])
+                edges.append(edges[q].copy())
+                first.append(first[q])
+                count.append(0)
+                while p != -1 and edges[p].get(ch) == q:
+                    edges[p][ch] = clone
+                    p = link[p]
+                link[q] = link[cur] = clone
+        last = cur
+
+    # push counts up the suffix links, longest states first (counting sort)
+    buckets: List[List[int]] = [[] for _ in range(len(s) + 1)]
+    for state in range(1, len(length)):
+        buckets[length[state]].append(state)
+    for size in range(len(s), 0, -1):
+        for state in buckets[size]:
+            count[link[state]] += count[state]
+
+    best_count = best_length = 0
+    best_start = 0
+    for state in range(1, len(length)):
+        c, n = count[state], length[state]
+        start = first[state] - n + 1
+        if c > best_count or (
+            c == best_count
+            and (n > best_length or (n == best_length and start < best_start))
+        ):
+            best_count, best_length, best_start = c, n, start
+
+    return s[best_start : best_start + best_length]
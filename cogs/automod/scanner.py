@@ -0,0 +1,203 @@
+import re
+from collections import OrderedDict
+from typing import Dict, Optional, Pattern, Tuple
+from urllib.parse import urlparse
+
+from emoji import UNICODE_EMOJI
+
+__all__ = ("TLDS", "ScanResult", "scan", "scan_message")
+
+# top level domains that count as links when a message names a bare domain
+TLDS = frozenset(
+    """
+    com net org edu gov mil aero asia biz cat coop info int jobs mobi museum
+    name post pro tel travel xxx dev xyz app ac ad ae af ag ai al am an ao aq
+    ar as at au aw ax az ba bb bd be bf bg bh bi bj bm bn bo br bs bt bv bw by
+    bz ca cc cd cf cg ch ci ck cl cm cn co cr cs cu cv cx cy cz dd de dj dk dm
+    do dz ec ee eg eh er es et eu fi fj fk fm fo fr ga gb gd ge gf gg gh gi gl
+    gm gn gp gq gr gs gt gu gw gy hk hm hn hr ht hu id ie il im in io iq ir is
+    it je jm jo jp ke kg kh ki km kn kp kr kw ky kz la lb lc li lk lr ls lt lu
+    lv ly ma mc md me mg mh mk ml mm mn mo mp mq mr ms mt mu mv mw mx my mz na
+    nc ne nf ng ni nl no np nr nu nz om pa pe pf pg ph pk pl pm pn pr ps pt pw
+    py qa re ro rs ru rw sa sb sc sd se sg sh si sj sk sl sm sn so sr ss st su
+    sv sx sy sz tc td tf tg th tj tk tl tm tn to tp tr tt tv tw tz ua ug uk us
+    uy uz va vc ve vg vi vn vu wf ws ye yt yu za zm zw
+    """.split()
+)
+
+
+def _build_trie(sequences) -> dict:
+    # nested dicts keyed by character, None marks the end of a sequence
+    root = {}
+    for sequence in sequences:
+        node = root
+        for ch in sequence:
+            node = node.setdefault(ch, {})
+        node[None] = True
+    return root
+
+
+_EMOJI_TRIE = _build_trie(UNICODE_EMOJI["en"])
+
+
+def _char_class(chars) -> str:
+    # runs of code points as ranges, a class of single astral characters
+    # is searched linearly by re
+    ranges = []
+    for cp in sorted(map(ord, chars)):
+        if ranges and cp == ranges[-1][1] + 1:
+            ranges[-1][1] = cp
+        else:
+            ranges.append([cp, cp])
+    return "".join(
+        re.escape(chr(a)) + ("-" + re.escape(chr(b)) if b > a else "")
+        for a, b in ranges
+    )
+
+
+_EMOJI_HEADS = _char_class(ch for ch in _EMOJI_TRIE if ch is not None)
+
+# characters that only ever continue a sequence: ZWJ, variation selectors,
+# the keycap, skin tones and tag characters
+_EMOJI_JOINERS = "\u200d\ufe0e\ufe0f\u20e3\U0001f3fb-\U0001f3ff\U000e0020-\U000e007f"
+
+_BRANCHES = {
+    "custom": r"(?P<custom><a?:[a-zA-Z0-9_]{2,32}:[0-9]{18,22}>)",
+    "links": (
+        r"(?P<invite>(?=[hdw])(?:https?://)?(?:www\.)?"
+        r"(?:discord\.(?:gg|io|me|li)|discordapp\.com/invite)/\w+)"
+        r"|(?P<url>\bhttps?:[^\s<>]+)"
+        r"|(?P<domain>(?<![@\w.\-])[a-z0-9]+(?:[.\-][a-z0-9]+)*"
+        r"\.(?P<tld>[a-z]{2,24})\b(?!@)(?:/[^\s<>]*)?)"
+    ),
+    # the lookahead rejects plain ASCII before the (long) class is tried
+    "unicode": (
+        r"(?P<unicode>(?=[#*0-9\u00a0-\U0010ffff])[" + _EMOJI_HEADS + r"]"
+        r"[" + _EMOJI_HEADS + _EMOJI_JOINERS + r"]*)"
+    ),
+}
+_scanners: Dict[Tuple[bool, bool, bool], Optional[Pattern]] = {}
+
+
+def _scanner(custom: bool, links: bool, unicode: bool) -> Optional[Pattern]:
+    """
+    The alternation of the branches that can match. Most messages have no
+    ``<``, ``.`` or ``:`` and are ASCII, so skipping branches that can't
+    match up front is much cheaper than failing them at every position.
+    """
+    key = (custom, links, unicode)
+    try:
+        return _scanners[key]
+    except KeyError:
+        pass
+
+    branches = [
+        _BRANCHES[name]
+        for name, wanted in zip(("custom", "links", "unicode"), key)
+        if wanted
+    ]
+    pattern = re.compile("|".join(branches), re.IGNORECASE) if branches else None
+    _scanners[key] = pattern
+    return pattern
+
+
+# trailing punctuation is part of the sentence, not the link
+_URL_TRAILER = "`!()[]{};:'\".,<>?«»“”‘’"
+
+
+class ScanResult:
+    """Everything AutoMod looks for in one message"""
+
+    __slots__ = ("links", "hosts", "invites", "custom_emojis", "unicode_emojis")
+
+    def __init__(self, links, hosts, invites, custom_emojis, unicode_emojis):
+        self.links: Tuple[str, ...] = links
+        self.hosts: Tuple[str, ...] = hosts
+        self.invites: Tuple[str, ...] = invites
+        self.custom_emojis: Tuple[str, ...] = custom_emojis
+        self.unicode_emojis: Tuple[str, ...] = unicode_emojis
+
+    @property
+    def emoji_count(self) -> int:
+        return len(self.custom_emojis) + len(self.unicode_emojis)
+
+    def __repr__(self) -> str:
+        return (
+            f"<ScanResult links={len(self.links)} invites={len(self.invites)} "
+            f"emojis={self.emoji_count}>"
+        )
+
+
+def _emoji_sequences(run: str, out: list):
+    # longest sequence in the trie at every position of the run
+    i, n = 0, len(run)
+    while i < n:
+        node, j, end = _EMOJI_TRIE, i, 0
+        while j < n:
+            node = node.get(run[j])
+            if node is None:
+                break
+            j += 1
+            if None in node:
+                end = j
+        if end:
+            out.append(run[i:end])
+            i = end
+        else:
+            i += 1
+
+
+def scan(content: str) -> ScanResult:
+    """
+    Finds links, invites, custom emojis and Unicode emoji sequences (ZWJ
+    sequences, skin tones, keycaps and flags count once) in a single pass.
+    """
+    links, hosts, invites, custom, unicode = [], {}, [], [], []
+
+    scanner = _scanner(
+        "<" in content,
+        "." in content or ":" in content,
+        not content.isascii(),
+    )
+    for match in scanner.finditer(content) if scanner else ():
+        kind = match.lastgroup
+        if kind == "unicode":
+            _emoji_sequences(match.group(), unicode)
+        elif kind == "custom":
+            custom.append(match.group())
+        elif kind == "domain":
+            if match.group("tld").lower() not in TLDS:
+                continue
+            link = match.group().rstrip(_URL_TRAILER)
+            links.append(link)
+            hosts[link.split("/", 1)[0].lower()] = None
+        else:
+            link = match.group().rstrip(_URL_TRAILER)
+            if kind == "invite":
+                invites.append(link)
+                host = link.split("://", 1)[-1]
+            else:
+                host = urlparse(link).netloc or link
+            links.append(link)
+            hosts[host.split("/", 1)[0].lower()] = None
+
+    return ScanResult(
+        tuple(links), tuple(hosts), tuple(invites), tuple(custom), tuple(unicode)
+    )
+
+
+# every check of one message shares its scan
+_recent: "OrderedDict[int, Tuple[str, ScanResult]]" = OrderedDict()
+
+
+def scan_message(message, cache_size: int = 256) -> ScanResult:
+    content = message.content
+    cached = _recent.get(message.id)
+    if cached is not None and cached[0] == content:
+        return cached[1]
+
+    result = scan(content)
+    _recent[message.id] = (content, result)
+    if len(_recent) > cache_size:
+        _recent.popitem(last=False)
+    return result
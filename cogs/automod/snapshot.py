@@ -0,0 +1,216 @@
+import time
+from types import MappingProxyType
+from typing import Callable, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+import discord
+
+# order checks are evaluated in, cheap message-local checks first
+CHECKS = (
+    "caps",
+    "zalgo",
+    "newlines",
+    "mentions",
+    "emojis",
+    "images",
+    "spam",
+    "invites",
+    "phishing",
+    "links",
+    "repeated_text",
+    "wave",
+)
+
+
+def _ids(group) -> FrozenSet:
+    """Bypass entries look like ``{"id": x}``, ``x`` may also be a list"""
+    if not isinstance(group, dict):
+        return frozenset()
+    value = group.get("id")
+    if value is None:
+        return frozenset()
+    if isinstance(value, (list, tuple, set)):
+        return frozenset(value)
+    return frozenset((value,))
+
+
+def _permission_mask(group) -> int:
+    """Permission names to a :class:`discord.Permissions` value, unknown ones ignored"""
+    flags = discord.Permissions.VALID_FLAGS
+    mask = 0
+    for name in _ids(group):
+        mask |= flags.get(name, 0)
+    return mask
+
+
+class MessageScope:
+    """
+    The author and channel of a message as bypass rules see them. The role
+    ids and channel permissions are only resolved when a rule needs them,
+    and then once per message however many rules do.
+    """
+
+    __slots__ = ("author_id", "channel_id", "_ctx", "_roles", "_permissions")
+
+    def __init__(self, ctx):
+        self.author_id = ctx.author.id
+        self.channel_id = ctx.channel.id
+        self._ctx = ctx
+        self._roles = None
+        self._permissions = None
+
+    @property
+    def roles(self) -> FrozenSet[int]:
+        if self._roles is None:
+            author = self._ctx.author
+            # the ids behind Member.roles, without resolving and sorting them
+            ids = getattr(author, "_roles", None)
+            if ids is None:
+                self._roles = frozenset()  # not a member (anymore)
+            else:
+                self._roles = frozenset((*ids, self._ctx.guild.id))
+        return self._roles
+
+    @property
+    def permissions(self) -> int:
+        if self._permissions is None:
+            author = self._ctx.author
+            if isinstance(author, discord.Member):
+                self._permissions = self._ctx.channel.permissions_for(author).value
+            else:
+                self._permissions = 0
+        return self._permissions
+
+
+def message_scope(ctx) -> MessageScope:
+    """The :class:`MessageScope` of ``ctx.message``, shared through ``ctx``"""
+    scope = ctx._scope
+    if scope is None:
+        scope = ctx._scope = MessageScope(ctx)
+    return scope
+
+
+class CheckRule:
+    """One enabled check of a guild, with everything it needs pre-resolved"""
+
+    __slots__ = (
+        "name",
+        "check",
+        "callback",
+        "params",
+        "actions",
+        "bypass_roles",
+        "bypass_members",
+        "bypass_channels",
+        "bypass_permissions",
+        "rate",
+        "amount",
+        "per",
+    )
+
+    def __init__(self, name: str, callback: Callable, data: dict):
+        bypass = data.get("bypass") or {}
+
+        self.name = name
+        # the check's own name, without the "check_" config prefix
+        self.check = name[6:] if name.startswith("check_") else name
+        self.callback = callback
+        self.params = MappingProxyType(
+            {k: v for k, v in data.items() if k not in ("actions", "bypass")}
+        )
+        self.actions = MappingProxyType(dict(data.get("actions") or {}))
+        self.bypass_roles = _ids(bypass.get("role"))
+        self.bypass_members = _ids(bypass.get("member"))
+        self.bypass_channels = _ids(bypass.get("channel"))
+        self.bypass_permissions = _permission_mask(bypass.get("permissions"))
+
+        # rate limited checks only measure the message, see counters.rate_check
+        self.rate = getattr(callback, "__automod_rate__", None)
+        if self.rate is not None:
+            self.amount = self.params.get("amount", self.rate.amount)
+            self.per = self.params.get("per", self.rate.per)
+        else:
+            self.amount = self.per = None
+
+    @property
+    def bypassable(self) -> bool:
+        return bool(
+            self.bypass_members
+            or self.bypass_channels
+            or self.bypass_roles
+            or self.bypass_permissions
+        )
+
+    def bypassed(self, scope: MessageScope) -> bool:
+        return bool(
+            scope.author_id in self.bypass_members
+            or scope.channel_id in self.bypass_channels
+            or (self.bypass_roles and not self.bypass_roles.isdisjoint(scope.roles))
+            or (self.bypass_permissions and scope.permissions & self.bypass_permissions)
+        )
+
+    def exceeded(self, total: int) -> bool:
+        if self.rate.inclusive:
+            return total >= self.amount
+        return total > self.amount
+
+    def __repr__(self) -> str:
+        return f"<CheckRule name={self.name!r} params={dict(self.params)!r}>"
+
+
+class RuleSnapshot:
+    """
+    Immutable, compiled AutoMod configuration of one guild.
+
+    Built once from the guild's storage hash and replaced whenever the
+    configuration changes, so the message path never reads config.
+    """
+
+    __slots__ = ("guild_id", "rules", "expires", "bypassable")
+
+    def __init__(
+        self, guild_id: int, rules: Iterable[CheckRule], expires: Optional[float]
+    ):
+        self.guild_id = guild_id
+        self.rules: Tuple[CheckRule, ...] = tuple(rules)
+        self.expires = expires
+        self.bypassable = any(rule.bypassable for rule in self.rules)
+
+    def applicable(self, ctx) -> List[CheckRule]:
+        """The rules ``ctx.message`` isn't exempt from"""
+        if not self.bypassable:
+            return list(self.rules)
+        scope = message_scope(ctx)
+        return [rule for rule in self.rules if not rule.bypassed(scope)]
+
+    @property
+    def expired(self) -> bool:
+        return self.expires is not None and time.monotonic() > self.expires
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def __repr__(self) -> str:
+        return f"<RuleSnapshot guild_id={self.guild_id} rules={[r.name for r in self.rules]}>"
+
+
+def compile_snapshot(
+    cog, guild_id: int, config: Mapping, ttl: Optional[float] = None
+) -> RuleSnapshot:
+    """Resolves the ``check_*`` entries of ``config`` against ``cog``"""
+    rules = []
+    for name in sorted(
+        (k for k in config if isinstance(k, str) and k.startswith("check_")),
+        key=lambda k: (
+            CHECKS.index(k[6:]) if k[6:] in CHECKS else len(CHECKS),
+            k,
+        ),
+    ):
+        callback = getattr(cog, name, None)
+        data = config[name]
+        if callback is None or not isinstance(data, dict):
+            continue
+        rules.append(CheckRule(name, callback, data))
+
+    return RuleSnapshot(
+        guild_id, rules, time.monotonic() + ttl if ttl is not None else None
+    )
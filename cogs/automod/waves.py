@@ -0,0 +1,193 @@
+import re
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+import numpy
+
+__all__ = ("minhash", "similarity", "WaveIndex", "WaveDetector")
+
+# 32 hash functions, banded 8 x 4 for LSH: messages that share ~80% of their
+# shingles collide in at least one band almost always, ~30% almost never
+PERMUTATIONS = 32
+BANDS = 8
+ROWS = PERMUTATIONS // BANDS
+
+_PRIME = (1 << 31) - 1
+_rng = numpy.random.default_rng(0x5EED)
+_A = _rng.integers(1, _PRIME, size=PERMUTATIONS, dtype=numpy.uint64)
+_B = _rng.integers(0, _PRIME, size=PERMUTATIONS, dtype=numpy.uint64)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def minhash(text: str, shingle: int = 3) -> numpy.ndarray:
+    """
+    MinHash signature of the character ``shingle``-grams of ``text``; the
+    share of equal positions in two signatures estimates the Jaccard
+    similarity of the messages.
+    """
+    text = _WHITESPACE.sub(" ", text.lower()).strip()
+    grams = {text[i : i + shingle] for i in range(max(len(text) - shingle + 1, 1))}
+
+    hashes = numpy.fromiter(
+        # crc32 rather than hash() so signatures don't change between processes
+        (zlib.crc32(g.encode()) % _PRIME for g in grams),
+        dtype=numpy.uint64,
+        count=len(grams),
+    )
+    # (a * h + b) mod p for every hash function at once, a * h stays < 2^62
+    return ((numpy.outer(hashes, _A) + _B) % _PRIME).min(axis=0).astype(numpy.uint32)
+
+
+def similarity(a: numpy.ndarray, b: numpy.ndarray) -> float:
+    return float(numpy.count_nonzero(a == b)) / PERMUTATIONS
+
+
+def _bands(signature: numpy.ndarray):
+    raw = signature.tobytes()
+    size = ROWS * 4
+    for band in range(BANDS):
+        yield hash((band, raw[band * size : (band + 1) * size]))
+
+
+class WaveIndex:
+    """
+    The recent messages of one guild: a ring of ``capacity`` slots holding a
+    timestamp, author and signature in flat arrays, plus LSH buckets mapping
+    every band of a signature to the slots holding it. Overwritten and
+    expired slots leave their buckets, so memory is bounded by the ring.
+    """
+
+    __slots__ = (
+        "capacity",
+        "window",
+        "stamps",
+        "authors",
+        "signatures",
+        "head",
+        "size",
+        "buckets",
+    )
+
+    def __init__(self, capacity: int = 256, window: float = 30.0):
+        self.capacity = capacity
+        self.window = window
+        self.stamps = array("d", bytes(8 * capacity))
+        self.authors = array("Q", bytes(8 * capacity))
+        self.signatures = numpy.zeros((capacity, PERMUTATIONS), dtype=numpy.uint32)
+        self.head = 0  # oldest slot
+        self.size = 0
+        self.buckets: Dict[int, List[int]] = {}
+
+    def _drop(self, slot: int):
+        for key in _bands(self.signatures[slot]):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.remove(slot)
+                if not bucket:
+                    del self.buckets[key]
+
+    def _pop(self):
+        self._drop(self.head)
+        self.head = (self.head + 1) % self.capacity
+        self.size -= 1
+
+    def expire(self, now: float):
+        cutoff = now - self.window
+        while self.size and self.stamps[self.head] <= cutoff:
+            self._pop()
+
+    @property
+    def newest(self) -> float:
+        if not self.size:
+            return 0.0
+        return self.stamps[(self.head + self.size - 1) % self.capacity]
+
+    def add(
+        self,
+        author_id: int,
+        signature: numpy.ndarray,
+        now: float,
+        threshold: float = 0.7,
+    ) -> Set[int]:
+        """
+        Inserts a message and returns the authors of every message in the
+        window at least ``threshold`` similar to it, including ``author_id``.
+        """
+        self.expire(now)
+
+        keys = list(_bands(signature))
+        candidates = set()
+        for key in keys:
+            candidates.update(self.buckets.get(key, ()))
+
+        authors = {author_id}
+        for slot in candidates:
+            if similarity(self.signatures[slot], signature) >= threshold:
+                authors.add(self.authors[slot])
+
+        if self.size == self.capacity:
+            # the oldest message makes room even if it hasn't expired
+            self._pop()
+
+        slot = (self.head + self.size) % self.capacity
+        self.stamps[slot] = now
+        self.authors[slot] = author_id
+        self.signatures[slot] = signature
+        self.size += 1
+        for key in keys:
+            self.buckets.setdefault(key, []).append(slot)
+        return authors
+
+
+class WaveDetector:
+    """
+    A :class:`WaveIndex` per guild, at most ``max_guilds`` of them. The least
+    recently active guild's index is evicted first, as is any guild that has
+    been quiet for longer than its window.
+    """
+
+    def __init__(self, *, capacity: int = 256, max_guilds: int = 1000):
+        self.capacity = capacity
+        self.max_guilds = max_guilds
+        self._indexes: "OrderedDict[int, WaveIndex]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    def add(
+        self,
+        guild_id: int,
+        author_id: int,
+        content: str,
+        *,
+        window: float = 30.0,
+        threshold: float = 0.7,
+        now: Optional[float] = None,
+    ) -> Set[int]:
+        now = time.monotonic() if now is None else now
+
+        index = self._indexes.get(guild_id)
+        if index is None:
+            index = self._indexes[guild_id] = WaveIndex(self.capacity, window)
+        else:
+            self._indexes.move_to_end(guild_id)
+            index.window = window
+
+        authors = index.add(author_id, minhash(content), now, threshold)
+        self._evict(now)
+        return authors
+
+    def _evict(self, now: float):
+        indexes = self._indexes
+        while indexes:
+            oldest = next(iter(indexes.values()))
+            if len(indexes) <= self.max_guilds and oldest.newest > now - oldest.window:
+                break
+            indexes.popitem(last=False)
+
+    def evict(self, guild_id: int):
+        self._indexes.pop(guild_id, None)
@@ -0,0 +1,136 @@
+import time
+import typing
+
+import discord
+from discord.ext import commands
+
+from ink.core import squidcommand, Context
+from .ladder import ACTIONS, MAX_THRESHOLD, Ladder, PunishmentQueue, Step
+from .ledger import InfractionLedger
+
+
+class Infractions(commands.Cog):
+    """
+    Keeps a decaying infraction score for every member and escalates through
+    the guild's ladder (warn -> timeout -> kick -> ban by default) as the
+    score crosses each step. Listens to the ``member_infraction`` and
+    ``member_quarantine`` events AutoMod dispatches.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.half_life = bot.config.get("infraction-half-life", 7 * 86400)
+        self.ladder_ttl = bot.config.get("infraction-ladder-ttl", 60)
+        # guild id -> (Ladder, expires)
+        self.ladders: typing.Dict[int, typing.Tuple[Ladder, float]] = {}
+        self.punishments = PunishmentQueue(loop=bot.loop)
+        self._ledger = None
+
+    @property
+    def ledger(self) -> InfractionLedger:
+        # the redis pool is only connected once the bot starts
+        if self._ledger is None:
+            self._ledger = InfractionLedger(
+                self.bot.redis, half_life=self.half_life, loop=self.bot.loop
+            )
+        return self._ledger
+
+    def cog_unload(self):
+        if self._ledger is not None:
+            self.bot.loop.create_task(self._ledger.close())
+        self.bot.loop.create_task(self.punishments.close())
+
+    async def get_ladder(self, guild_id: int) -> Ladder:
+        cached = self.ladders.get(guild_id)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+
+        storage = self.bot.storage(self.qualified_name, guild_id)
+        ladder = Ladder.from_config(await storage.get("ladder"))
+        self.ladders[guild_id] = (ladder, time.monotonic() + self.ladder_ttl)
+        return ladder
+
+    @commands.Cog.listener()
+    async def on_member_infraction(self, member: discord.Member, infractions: int = 1):
+        previous, score = await self.ledger.record(
+            member.guild.id, member.id, infractions
+        )
+        step = (await self.get_ladder(member.guild.id)).escalation(previous, score)
+        if step is not None:
+            self.punishments.submit(
+                member,
+                step.action,
+                duration=step.duration,
+                reason=f"Infraction score {score:.1f} reached {step.threshold}",
+            )
+
+    @commands.Cog.listener()
+    async def on_member_quarantine(self, member: discord.Member, values: dict):
+        if not isinstance(values, dict):
+            values = {}  # enabled without options
+        self.punishments.submit(
+            member,
+            "quarantine",
+            duration=values.get("duration"),
+            role=values.get("role"),
+            reason="AutoMod quarantine",
+        )
+
+    @squidcommand("infractions")
+    @commands.guild_only()
+    async def infractions(self, ctx: Context, member: discord.Member = None):
+        """View the infraction score of yourself or a member"""
+        member = member or ctx.author
+        score = await self.ledger.score(ctx.guild.id, member.id)
+        ladder = await self.get_ladder(ctx.guild.id)
+
+        i = ladder.index(score)
+        upcoming = ladder.steps[i + 1] if i + 1 < len(ladder.steps) else None
+        yield discord.Embed(
+            color=self.bot.color,
+            title=f"Infractions of {member}",
+            description=f"Score: **{score:.2f}**"
+            + (
+                f"\nNext step: **{upcoming.action}** at {upcoming.threshold}"
+                if upcoming
+                else ""
+            ),
+        )
+
+    @squidcommand("ladder")
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    async def ladder(
+        self,
+        ctx: Context,
+        threshold: int = None,
+        action: str = None,
+        minutes: int = None,
+    ):
+        """
+        View the escalation ladder, or set the action taken at a score
+
+        Use `none` as the action to remove a step.
+        """
+        ladder = await self.get_ladder(ctx.guild.id)
+        if threshold is not None:
+            if action not in (*ACTIONS, "none"):
+                raise commands.BadArgument(
+                    f"action must be one of {', '.join(ACTIONS)} or none"
+                )
+            if not 1 <= threshold <= MAX_THRESHOLD:
+                raise commands.BadArgument(
+                    f"threshold must be between 1 and {MAX_THRESHOLD}"
+                )
+            steps = [s for s in ladder.steps if s.threshold != threshold]
+            if action != "none":
+                steps.append(Step(threshold, action, minutes * 60 if minutes else None))
+            ladder = Ladder(steps)
+            await ctx.storage.set_many({"ladder": [s.to_dict() for s in ladder.steps]})
+            self.ladders.pop(ctx.guild.id, None)
+
+        yield "\n".join(
+            f"`{s.threshold:>3}` {s.action}"
+            + (f" ({s.duration // 60}m)" if s.duration else "")
+            for s in ladder.steps
+        ) or "No steps, infractions are only recorded"
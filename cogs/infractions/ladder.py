@@ -0,0 +1,167 @@
+import asyncio
+import datetime
+import logging
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import discord
+
+__all__ = (
+    "ACTIONS",
+    "MAX_THRESHOLD",
+    "Step",
+    "Ladder",
+    "PunishmentQueue",
+    "DEFAULT_LADDER",
+)
+
+log = logging.getLogger(__name__)
+
+# punishments from mildest to harshest, a member only gets the harshest one
+# queued for them at a time
+ACTIONS = ("warn", "quarantine", "timeout", "kick", "ban")
+SEVERITY = {action: i for i, action in enumerate(ACTIONS)}
+
+# scores decay, a step this high would never be reached anyway
+MAX_THRESHOLD = 1000
+
+DEFAULT_LADDER = [
+    {"threshold": 3, "action": "warn"},
+    {"threshold": 5, "action": "timeout", "duration": 600},
+    {"threshold": 8, "action": "kick"},
+    {"threshold": 12, "action": "ban"},
+]
+
+
+class Step:
+    __slots__ = ("threshold", "action", "duration")
+
+    def __init__(self, threshold: int, action: str, duration: Optional[int] = None):
+        if action not in SEVERITY:
+            raise ValueError(f"unknown action {action!r}")
+        self.threshold = int(threshold)
+        self.action = action
+        self.duration = duration
+
+    def to_dict(self) -> dict:
+        data = {"threshold": self.threshold, "action": self.action}
+        if self.duration:
+            data["duration"] = self.duration
+        return data
+
+    def __repr__(self) -> str:
+        return f"<Step {self.threshold} {self.action} duration={self.duration}>"
+
+
+class Ladder:
+    """
+    A guild's escalation steps, sorted by threshold so the step reached by a
+    score is found by bisecting the thresholds.
+    """
+
+    __slots__ = ("steps", "_thresholds")
+
+    def __init__(self, steps: Iterable[Step]):
+        self.steps: Tuple[Step, ...] = tuple(sorted(steps, key=lambda s: s.threshold))
+        self._thresholds: List[int] = [step.threshold for step in self.steps]
+
+    @classmethod
+    def from_config(cls, data: Optional[List[dict]]) -> "Ladder":
+        return cls(Step(**step) for step in (DEFAULT_LADDER if data is None else data))
+
+    def index(self, score: float) -> int:
+        """Index of the highest step ``score`` reached, -1 below the first"""
+        return bisect_right(self._thresholds, score) - 1
+
+    def escalation(self, previous: float, score: float) -> Optional[Step]:
+        """The step the member just reached, if the infraction crossed one"""
+        i = self.index(score)
+        if i > self.index(previous):
+            return self.steps[i]
+        return None
+
+
+class _Punishment:
+    __slots__ = ("member", "action", "duration", "reason", "role")
+
+    def __init__(self, member, action, duration, reason, role):
+        self.member = member
+        self.action = action
+        self.duration = duration
+        self.reason = reason
+        self.role = role
+
+
+class PunishmentQueue:
+    """
+    Collects punishments for ``window`` seconds and carries them out
+    together, at most ``concurrency`` API calls at a time. A burst of
+    infractions for one member ends up as a single call for the harshest
+    punishment they reached.
+    """
+
+    def __init__(self, *, window: float = 0.5, concurrency: int = 10, loop=None):
+        self.window = window
+        self._loop = loop or asyncio.get_event_loop()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._pending: Dict[Tuple[int, int], _Punishment] = {}
+        self._flush_handle = None
+
+    def submit(
+        self,
+        member: discord.Member,
+        action: str,
+        *,
+        duration: Optional[int] = None,
+        reason: Optional[str] = None,
+        role: Optional[int] = None,
+    ):
+        key = (member.guild.id, member.id)
+        current = self._pending.get(key)
+        if current is None or SEVERITY[action] > SEVERITY[current.action]:
+            self._pending[key] = _Punishment(member, action, duration, reason, role)
+
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.window, self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        self._loop.create_task(self._run(list(pending.values())))
+
+    async def _run(self, punishments: List[_Punishment]):
+        results = await asyncio.gather(
+            *[self._apply(p) for p in punishments], return_exceptions=True
+        )
+        for punishment, result in zip(punishments, results):
+            if isinstance(result, Exception):
+                log.warning(
+                    "%s of %s failed: %r", punishment.action, punishment.member, result
+                )
+
+    async def _apply(self, p: _Punishment):
+        member, me = p.member, p.member.guild.me
+        perms = me.guild_permissions
+        above = me.top_role > member.top_role
+
+        async with self._semaphore:
+            if p.action == "warn":
+                await member.send(
+                    f"You have been warned in **{member.guild.name}**: {p.reason}"
+                )
+            elif p.action == "quarantine" and p.role and perms.manage_roles:
+                await member.add_roles(discord.Object(id=p.role), reason=p.reason)
+            elif p.action in ("timeout", "quarantine") and perms.moderate_members:
+                if above:
+                    await member.timeout(
+                        datetime.timedelta(seconds=p.duration or 600), reason=p.reason
+                    )
+            elif p.action == "kick" and perms.kick_members and above:
+                await member.kick(reason=p.reason)
+            elif p.action == "ban" and perms.ban_members and above:
+                await member.ban(reason=p.reason, delete_message_days=0)
+
+    async def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush()
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import math
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from ink.utils.db import RedisScript
+
+__all__ = ("InfractionLedger",)
+
+log = logging.getLogger(__name__)
+
+# KEYS[1]: the guild's ledger hash
+# ARGV: now, half life, key ttl, then a (member, weight) pair per infraction
+#
+# Every member is one field holding "score:timestamp"; the score is decayed
+# to now before the weight is added. Returns the score before and after
+# each infraction as strings (Lua numbers would be truncated to integers).
+RECORD = RedisScript(
+    """
+local now = tonumber(ARGV[1])
+local half_life = tonumber(ARGV[2])
+local out = {}
+for i = 4, #ARGV, 2 do
+    local member = ARGV[i]
+    local score = 0
+    local packed = redis.call('HGET', KEYS[1], member)
+    if packed then
+        local s, t = string.match(packed, '([^:]+):([^:]+)')
+        score = tonumber(s) * math.pow(0.5, (now - tonumber(t)) / half_life)
+    end
+    local new = score + tonumber(ARGV[i + 1])
+    redis.call('HSET', KEYS[1], member, string.format('%.4f:%d', new, now))
+    out[#out + 1] = string.format('%.4f', score)
+    out[#out + 1] = string.format('%.4f', new)
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return out
+"""
+)
+
+
+def decay(score: float, since: float, now: float, half_life: float) -> float:
+    return score * math.pow(0.5, (now - since) / half_life)
+
+
+class InfractionLedger:
+    """
+    Decaying infraction scores for every member, one Redis hash per guild.
+
+    A member's score halves every ``half_life`` seconds. :meth:`record`
+    never waits on Redis itself: infractions are buffered and written
+    ``window`` seconds later, one script call per guild and all of them in
+    a single pipeline, and the returned future resolves to the member's
+    ``(previous, new)`` score once that write is done.
+    """
+
+    def __init__(
+        self, redis, *, half_life: float = 7 * 86400, window: float = 0.25, loop=None
+    ):
+        self.redis = redis
+        self.half_life = half_life
+        self.window = window
+        self._loop = loop or asyncio.get_event_loop()
+        # guild id -> [(member id, weight, future)]
+        self._buffer: Dict[int, List[Tuple[int, float, asyncio.Future]]] = defaultdict(
+            list
+        )
+        self._flush_handle = None
+
+    @staticmethod
+    def key(guild_id: int) -> str:
+        return f"infractions:{guild_id}"
+
+    def record(
+        self, guild_id: int, member_id: int, weight: float = 1
+    ) -> asyncio.Future:
+        future = self._loop.create_future()
+        self._buffer[guild_id].append((member_id, weight, future))
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.window, self._flush)
+        return future
+
+    def _flush(self):
+        self._flush_handle = None
+        buffer, self._buffer = self._buffer, defaultdict(list)
+        self._loop.create_task(self._write(buffer))
+
+    async def _write(self, buffer, now: Optional[float] = None):
+        now = int(time.time() if now is None else now)
+        # entries outlive ten half lives only if they keep getting written
+        ttl = int(self.half_life * 10)
+
+        calls = []
+        for guild_id, entries in buffer.items():
+            args = [now, self.half_life, ttl]
+            for member_id, weight, _ in entries:
+                args += [member_id, weight]
+            calls.append(([self.key(guild_id)], args))
+
+        try:
+            results = await RECORD.run_many(self.redis, calls)
+        except Exception as exc:
+            results = [exc] * len(calls)
+
+        for entries, result in zip(buffer.values(), results):
+            if isinstance(result, Exception):
+                log.warning("writing %d infractions failed: %r", len(entries), result)
+                for *_, future in entries:
+                    if not future.done():
+                        future.set_exception(result)
+                continue
+            for i, (*_, future) in enumerate(entries):
+                if not future.done():
+                    future.set_result((float(result[i * 2]), float(result[i * 2 + 1])))
+
+    async def score(self, guild_id: int, member_id: int) -> float:
+        packed = await self.redis.hget(self.key(guild_id), member_id)
+        if not packed:
+            return 0.0
+        score, _, since = packed.partition(":")
+        return decay(float(score), float(since), time.time(), self.half_life)
+
+    async def clear(self, guild_id: int, member_id: int):
+        await self.redis.hdel(self.key(guild_id), member_id)
+
+    async def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+            await self._write(self._buffer)
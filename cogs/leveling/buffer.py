@@ -0,0 +1,175 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+__all__ = ("XPBuffer",)
+
+log = logging.getLogger(__name__)
+
+# (guild id, member id)
+Ident = Tuple[int, int]
+
+
+class XPBuffer:
+    """
+    Write-behind XP. :meth:`grant` adds to an in-memory delta and returns the
+    member's totals right away; the deltas are written every ``interval``
+    seconds, or as soon as ``max_pending`` members have one, as a single
+    pipeline of ZINCRBY. Increments commute, so nothing is lost to other
+    processes writing the same leaderboard in between. Failed writes are
+    kept and retried with an exponential backoff of up to ``max_backoff``.
+
+    The totals ZINCRBY replies with are remembered for the ``max_totals``
+    most recently active members, so level ups are worked out from memory
+    and a member's score is only read the first time they earn XP.
+    """
+
+    def __init__(
+        self,
+        redis,
+        *,
+        interval: float = 5.0,
+        max_pending: int = 1000,
+        max_totals: int = 10000,
+        max_backoff: float = 60.0,
+        loop=None,
+    ):
+        self.redis = redis
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_totals = max_totals
+        self.max_backoff = max_backoff
+        self._loop = loop or asyncio.get_event_loop()
+
+        self._pending: Dict[Ident, int] = {}
+        # deltas of the write in flight, not in the remembered totals yet
+        self._writing: Dict[Ident, int] = {}
+        self._totals: "OrderedDict[Ident, int]" = OrderedDict()
+        self._flush_handle = None
+        self._flush_task: Optional[asyncio.Task] = None
+        # consecutive failed writes
+        self._failures = 0
+        self.writes = 0
+
+    @staticmethod
+    def key(guild_id: int) -> str:
+        return f"lb:{guild_id}"
+
+    @staticmethod
+    def field(member_id: int) -> str:
+        return f"{member_id}:xp"
+
+    def unflushed(self, guild_id: int, member_id: int) -> int:
+        """XP granted to the member that Redis doesn't have yet"""
+        ident = (guild_id, member_id)
+        return self._pending.get(ident, 0) + self._writing.get(ident, 0)
+
+    def _remember(self, ident: Ident, total: int):
+        self._totals[ident] = total
+        self._totals.move_to_end(ident)
+        if len(self._totals) > self.max_totals:
+            self._totals.popitem(last=False)
+
+    async def grant(
+        self, guild_id: int, member_id: int, amount: int, batch=None
+    ) -> Tuple[int, int]:
+        """
+        Adds ``amount`` XP and returns the member's total before and after.
+        An unknown member's score is read once, through ``batch`` if given.
+        """
+        ident = (guild_id, member_id)
+        if ident not in self._totals:
+            key, field = self.key(guild_id), self.field(member_id)
+            if batch is not None:
+                score = await batch.read("zscore", key, field)
+            else:
+                score = await self.redis.zscore(key, field)
+            # a write may have landed while we waited, its reply is newer
+            if ident not in self._totals:
+                self._remember(ident, int(float(score or 0)))
+        else:
+            self._totals.move_to_end(ident)
+
+        before = self._totals[ident] + self.unflushed(guild_id, member_id)
+        self._pending[ident] = self._pending.get(ident, 0) + amount
+        self._schedule()
+        return before, before + amount
+
+    def _schedule(self):
+        if self._flush_task is not None:
+            return  # the running write schedules the next one
+        if len(self._pending) >= self.max_pending and not self._failures:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+            self._flush()
+        elif self._flush_handle is None:
+            # while redis keeps failing, wait longer between attempts
+            delay = self.interval * 2 ** min(self._failures, 16)
+            self._flush_handle = self._loop.call_later(
+                min(delay, max(self.interval, self.max_backoff)), self._flush
+            )
+
+    def _flush(self):
+        self._flush_handle = None
+        self._flush_task = self._loop.create_task(self._run())
+
+    async def _run(self):
+        try:
+            await self._write()
+        finally:
+            self._flush_task = None
+            if self._pending:
+                self._schedule()
+
+    async def _write(self):
+        if not self._pending:
+            return
+        self._writing, self._pending = self._pending, {}
+        entries = list(self._writing.items())
+
+        pipe = self.redis.pipeline()
+        for (guild_id, member_id), amount in entries:
+            pipe.zincrby(self.key(guild_id), amount, self.field(member_id))
+        self.writes += 1
+        try:
+            # pipelines aren't timed by the pool, a redis that stopped
+            # answering would otherwise hang the flush on shutdown
+            results = await asyncio.wait_for(
+                pipe.execute(return_exceptions=True),
+                getattr(self.redis, "timeout", None),
+            )
+        except Exception as exc:
+            results = [exc] * len(entries)
+
+        failed = []
+        for (ident, amount), result in zip(entries, results):
+            if isinstance(result, Exception):
+                # kept for the next write rather than lost
+                self._pending[ident] = self._pending.get(ident, 0) + amount
+                failed.append(result)
+            else:
+                self._remember(ident, int(float(result)))
+        self._writing = {}
+        self._failures = self._failures + 1 if failed else 0
+        if failed:
+            log.warning("writing xp of %d members failed: %r", len(failed), failed[0])
+
+    async def flush(self):
+        """Writes everything granted so far"""
+        while self._flush_task is not None:
+            await asyncio.shield(self._flush_task)
+        if self._pending:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+            self._flush()
+            await asyncio.shield(self._flush_task)
+
+    async def close(self):
+        await self.flush()
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._pending:
+            log.warning("dropping unwritten xp of %d members", len(self._pending))
+            self._pending.clear()
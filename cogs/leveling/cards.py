@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+__all__ = ("CardCache",)
+
+log = logging.getLogger(__name__)
+
+# bump when the card drawing changes, cards on disk are then never read again
+RENDER_VERSION = 1
+
+Card = Tuple[bytes, str]
+
+
+class CardCache:
+    """
+    Finished rank cards, as ``(image bytes, extension)``. The first level is
+    an LRU of at most ``memory_bytes``, the second a content addressed store
+    in ``directory`` of at most ``disk_bytes``: every distinct card is one
+    file under ``blobs/`` named by its sha256, and every key is a symlink
+    under ``refs/`` pointing at one. Blobs are evicted oldest first, going
+    by their mtime, which is bumped on every hit; refs left dangling are
+    cleaned up as they're found.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        *,
+        memory_bytes: int = 32 * 1024 * 1024,
+        disk_bytes: int = 512 * 1024 * 1024,
+        loop=None,
+    ):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._loop = loop or asyncio.get_event_loop()
+
+        self._entries: "OrderedDict[str, Card]" = OrderedDict()
+        self._memory_size = 0
+        self._disk_size: Optional[int] = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if directory is not None:
+            for sub in ("blobs", "refs"):
+                os.makedirs(os.path.join(directory, sub), exist_ok=True)
+
+    @staticmethod
+    def key(*parts) -> str:
+        return hashlib.blake2b(
+            repr((RENDER_VERSION, *parts)).encode(), digest_size=16
+        ).hexdigest()
+
+    def _remember(self, key: str, card: Card):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old[0])
+        if len(card[0]) > self.memory_bytes:
+            return
+        self._entries[key] = card
+        self._memory_size += len(card[0])
+        while self._memory_size > self.memory_bytes:
+            _, (data, _) = self._entries.popitem(last=False)
+            self._memory_size -= len(data)
+
+    async def get(self, key: str) -> Optional[Card]:
+        card = self._entries.get(key)
+        if card is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return card
+
+        if self.directory is not None:
+            try:
+                card = await self._loop.run_in_executor(None, self._read, key)
+            except OSError as exc:
+                log.warning("reading cached rank card %s failed: %r", key, exc)
+            if card is not None:
+                self.disk_hits += 1
+                self._remember(key, card)
+                return card
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, data: bytes, ext: str):
+        self._remember(key, (data, ext))
+        if self.directory is not None:
+            try:
+                await self._loop.run_in_executor(None, self._write, key, data, ext)
+            except OSError as exc:
+                log.warning("storing rank card %s failed: %r", key, exc)
+
+    # disk, run in an executor
+
+    def _ref(self, key: str) -> str:
+        return os.path.join(self.directory, "refs", key)
+
+    def _read(self, key: str) -> Optional[Card]:
+        ref = self._ref(key)
+        try:
+            with open(ref, "rb") as fp:
+                data = fp.read()
+            target = os.readlink(ref)
+        except FileNotFoundError:
+            if os.path.islink(ref):
+                os.unlink(ref)  # its blob was evicted
+            return None
+        os.utime(ref, follow_symlinks=True)
+        return data, target.rpartition(".")[2]
+
+    def _write(self, key: str, data: bytes, ext: str):
+        name = f"{hashlib.sha256(data).hexdigest()}.{ext}"
+        blob = os.path.join(self.directory, "blobs", name)
+        if os.path.exists(blob):
+            os.utime(blob)
+        else:
+            tmp = f"{blob}.{os.urandom(4).hex()}.tmp"
+            with open(tmp, "wb") as fp:
+                fp.write(data)
+            os.replace(tmp, blob)
+            if self._disk_size is not None:
+                self._disk_size += len(data)
+
+        tmp = f"{self._ref(key)}.{os.urandom(4).hex()}.tmp"
+        os.symlink(os.path.join("..", "blobs", name), tmp)
+        os.replace(tmp, self._ref(key))
+
+        if self._disk_size is None or self._disk_size > self.disk_bytes:
+            self._evict()
+
+    def _evict(self):
+        blobs = []
+        with os.scandir(os.path.join(self.directory, "blobs")) as it:
+            for entry in it:
+                stat = entry.stat()
+                blobs.append((stat.st_mtime, stat.st_size, entry.path))
+        self._disk_size = sum(size for _, size, _ in blobs)
+        if self._disk_size <= self.disk_bytes:
+            return
+
+        # down to 90% so the directory isn't scanned again on the next write
+        blobs.sort()
+        target = self.disk_bytes * 0.9
+        evicted = 0
+        for _, size, path in blobs:
+            if self._disk_size <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            self._disk_size -= size
+            evicted += 1
+
+        with os.scandir(os.path.join(self.directory, "refs")) as it:
+            for entry in it:
+                if not os.path.exists(entry.path):
+                    os.unlink(entry.path)
+        log.info("evicted %d cached rank cards", evicted)
+
+    def stats(self) -> dict:
+        return {
+            "memory_entries": len(self._entries),
+            "memory_bytes": self._memory_size,
+            "disk_bytes": self._disk_size,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
@@ -1,5 +1,7 @@
 import asyncio
-from collections import defaultdict
+import os
+import tempfile
+import time
 import typing
 from discord.ext import commands
 import wand
@@ -15,9 +17,21 @@ from wand.sequence import Sequence
 from wand.display import display
 import random
 from concurrent.futures import ThreadPoolExecutor
-from copy import copy
-from .player import Player, get_level_from_xp, lvls_xp
-from .config import DEFAULT_XP_COOLDOWN, DEFAULT_XP_REWARD_RANGE
+from .buffer import XPBuffer
+from .cards import CardCache
+from .levels import level_from_xp, progress
+from .player import Player, PlayerCache
+from .config import (
+    DEFAULT_CARD_BUCKETS,
+    DEFAULT_CARD_CACHE_DISK,
+    DEFAULT_CARD_CACHE_MEMORY,
+    DEFAULT_PLAYER_CACHE_SIZE,
+    DEFAULT_PLAYER_CACHE_TTL,
+    DEFAULT_XP_COOLDOWN,
+    DEFAULT_XP_FLUSH_INTERVAL,
+    DEFAULT_XP_FLUSH_SIZE,
+    DEFAULT_XP_REWARD_RANGE,
+)
 from ink.utils.decorators import asyncexe
 
 executor = ThreadPoolExecutor()
@@ -36,9 +50,28 @@ class Leveling(commands.Cog):
         self.xp_reward_range = tuple(
             self.bot.config.get("xp-reward-range", DEFAULT_XP_REWARD_RANGE)
         )
-
-        self.players = defaultdict(dict)
-        self._get_level_xp = lambda n: 5 * (n ** 2) + 50 * n + 100
+        # member id -> monotonic time their cooldown ends
+        self.cooldowns = {}
+        self._prune_cooldowns_at = 10000
+
+        self._xp = None
+        self._players = None
+
+        # progress is drawn in steps so cards can be reused between grants
+        self.card_buckets = bot.config.get("rank-card-buckets", DEFAULT_CARD_BUCKETS)
+        self.cards = CardCache(
+            bot.config.get(
+                "rank-card-cache-dir",
+                os.path.join(tempfile.gettempdir(), "squidbot-rank-cards"),
+            ),
+            memory_bytes=bot.config.get(
+                "rank-card-cache-memory", DEFAULT_CARD_CACHE_MEMORY
+            ),
+            disk_bytes=bot.config.get("rank-card-cache-disk", DEFAULT_CARD_CACHE_DISK),
+            loop=bot.loop,
+        )
+        bot.shutdown_hooks.append(self.close_xp)
+        bot.metrics.register(self.collect_metrics)
 
         self.font_factory = lambda size: Font(
             path=__file__[:-6] + "Aquire.otf",
@@ -47,28 +80,78 @@ class Leveling(commands.Cog):
             size=size or 80,
         )
 
-    def get_player(self, member: discord.Object):
-        cached_player = self.players.get(member.id)
-        if cached_player:
-            return cached_player
-        player = Player(member, member.guild, self.bot.sync_redis)
-        self.players[member.id] = player
-
-        return player
-
-    def get_player_info(self, member):
+    @property
+    def xp(self) -> XPBuffer:
+        # the redis pool is only connected once the bot starts
+        if self._xp is None:
+            self._xp = XPBuffer(
+                self.bot.redis,
+                interval=self.bot.config.get(
+                    "xp-flush-interval", DEFAULT_XP_FLUSH_INTERVAL
+                ),
+                max_pending=self.bot.config.get("xp-flush-size", DEFAULT_XP_FLUSH_SIZE),
+                loop=self.bot.loop,
+            )
+        return self._xp
+
+    @property
+    def players(self) -> PlayerCache:
+        if self._players is None:
+            self._players = PlayerCache(
+                self.bot.redis,
+                maxsize=self.bot.config.get(
+                    "player-cache-size", DEFAULT_PLAYER_CACHE_SIZE
+                ),
+                ttl=self.bot.config.get("player-cache-ttl", DEFAULT_PLAYER_CACHE_TTL),
+            )
+        return self._players
+
+    def collect_metrics(self):
+        caches = [("rank_card_cache", self.cards)]
+        if self._players is not None:
+            caches.append(("player_cache", self._players))
+        for prefix, cache in caches:
+            for name, value in cache.stats().items():
+                if value is not None:
+                    yield f"# TYPE leveling_{prefix}_{name} gauge"
+                    yield f"leveling_{prefix}_{name} {value}"
+
+    async def close_xp(self):
+        if self._xp is not None:
+            await self._xp.close()
+
+    def cog_unload(self):
+        self.bot.shutdown_hooks.remove(self.close_xp)
+        self.bot.metrics.unregister(self.collect_metrics)
+        self.bot.loop.create_task(self.close_xp())
+
+    def on_cooldown(self, member_id: int) -> bool:
+        """Whether the member earned xp too recently, starting a cooldown if not"""
+        now = time.monotonic()
+        if self.cooldowns.get(member_id, 0) > now:
+            return True
+        if len(self.cooldowns) >= self._prune_cooldowns_at:
+            self.cooldowns = {k: v for k, v in self.cooldowns.items() if v > now}
+            self._prune_cooldowns_at = max(10000, len(self.cooldowns) * 2)
+        self.cooldowns[member_id] = now + self.xp_cooldown
+        return False
+
+    def get_player(self, member: discord.Member) -> Player:
+        return self.players.get(member.guild.id, member.id)
+
+    async def get_player_info(self, member):
         player = self.get_player(member)
-        if player.xp == 0:
-            return None
+        if player.stale:
+            await player.refresh(
+                self.players.ttl, self.xp.unflushed(member.guild.id, member.id)
+            )
         player_total_xp = player.xp
-        player_lvl = player.lvl
-        x = 0
-        for l in range(0, int(player_lvl)):
-            x += self._get_level_xp(l)
-        remaining_xp = int(player_total_xp - x)
-        level_xp = self._get_level_xp(player_lvl)
-        players = self.bot.sync_redis.zcount("leaderboard", 0, 1e9)
-        player_rank = player.rank
+        if player_total_xp == 0:
+            return None
+        player_lvl, remaining_xp, level_xp = progress(player_total_xp)
+        players = await self.bot.redis.zcard(player.key)
+        # xp that isn't written yet has no rank, it ranks last until it is
+        player_rank = player.rank or players + 1
 
         return {
             "total_xp": player_total_xp,
@@ -92,23 +175,29 @@ class Leveling(commands.Cog):
 
         author: discord.Member = context.author  # for future object-changing compat
 
-        key = f"Leveling:cd:{author.id}"
-        if await self.bot.redis.exists(key):
+        if self.on_cooldown(author.id):
             return
-        else:
-            await self.bot.redis.set(key, 1, expire=self.xp_cooldown)
-
-        player = self.get_player(context.author)
-
-        og_lvl = copy(player.lvl)
 
         amn = random.randint(*self.xp_reward_range)
 
-        player.xp += amn
+        # buffered, written with everyone else's xp a few seconds from now
+        before, xp = await self.xp.grant(
+            author.guild.id, author.id, amn, batch=context.batch
+        )
+        og_lvl, new_lvl = level_from_xp(before), level_from_xp(xp)
+
+        # only members someone looked at have a record to keep current
+        player = self.players.peek(author.guild.id, author.id)
+        if new_lvl != og_lvl:
+            player = player or self.get_player(author)
+            self.bot.dispatch("level_up", context, player, og_lvl, new_lvl)
+        if player is not None:
+            player.update(xp)
 
-        print(f"Gave {author.name} {amn} xp")
-        if player.lvl != og_lvl:
-            self.bot.dispatch("level_up", context, player, og_lvl, player.lvl)
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        if self._players is not None:
+            self._players.evict_guild(guild.id)
 
     @staticmethod
     def make_card(template, mask, img):
@@ -121,13 +210,19 @@ class Leveling(commands.Cog):
 
         return template
 
+    def card_progress(self, info) -> int:
+        """The member's progress into their level, in ``card_buckets`` steps"""
+        return info["remaining_xp"] * self.card_buckets // info["level_xp"]
+
     @asyncexe(executor)
-    def rank_card(self, pfp, member, info):
+    def rank_card(self, pfp, member, info) -> typing.Tuple[bytes, str]:
         with Drawing() as draw:
             draw.fill_color = Color("pink")
             draw.fill_opacity = 0.8
             if info:
-                width = int(info["remaining_xp"] / info["level_xp"] * 600)
+                bucket = self.card_progress(info)
+                width = bucket * 600 // self.card_buckets
+                shown_xp = bucket * info["level_xp"] // self.card_buckets
 
                 draw.rectangle(left=300, top=215, width=width, height=50, radius=20)
 
@@ -148,7 +243,7 @@ class Leveling(commands.Cog):
                 )  # their name centered up top
                 if info:
                     template.caption(
-                        f"{info['remaining_xp']} - {info['level_xp']}",
+                        f"{shown_xp} - {info['level_xp']}",
                         top=50,
                         left=325,
                         width=600,
@@ -159,7 +254,7 @@ class Leveling(commands.Cog):
                 with Image(blob=self.mask) as mask:
                     with Image(blob=pfp) as profile:
 
-                        if member.avatar.is_animated():
+                        if member.display_avatar.is_animated():
                             with Image() as base:
                                 for img in profile.sequence:
 
@@ -177,18 +272,13 @@ class Leveling(commands.Cog):
                                 base.format = "gif"
                                 bffr = BytesIO()
                                 base.save(file=bffr)
-                                bffr.seek(0)
-                                return discord.File(fp=bffr, filename="jaydumb.gif")
-                                # img_data = base.make_blob(fmt)
+                                return bffr.getvalue(), fmt
 
                         else:
                             card = self.make_card(template, mask, profile)
 
                             fmt = "png"
-                            return discord.File(
-                                fp=BytesIO(card.make_blob(fmt)),
-                                filename=f"jaydumb.{fmt}",
-                            )  # thanks jay
+                            return card.make_blob(fmt), fmt
 
     @squidcommand("rank", aliases=["r"])
     @commands.bot_has_guild_permissions(attach_files=True)
@@ -203,16 +293,29 @@ class Leveling(commands.Cog):
             [ attach files ]
         """
         member = member or ctx.author
-        info = self.get_player_info(member)
-        url = str(member.avatar.replace(static_format="png", size=512))
-        print(url)
         if member.bot:
             raise commands.CommandError("Bot's don't have profiles")
-
-        async with ctx.channel.typing():
-            async with self.bot.session.get(url) as req:
-                pfp = await req.read()
-
-            yield await self.rank_card(pfp, member, info)
-
-            # img_data = image.make_blob(str("gif" if member.avatar.is_animated() else "png"))
+        info = await self.get_player_info(member)
+
+        avatar = member.display_avatar
+        key = self.cards.key(
+            avatar.key,
+            member.name,
+            info and info["lvl"],
+            info and self.card_progress(info),
+            info and info["rank"],
+        )
+        card = await self.cards.get(key)
+        rendered = card is None
+        if rendered:
+            async with ctx.channel.typing():
+                url = str(avatar.replace(static_format="png", size=512))
+                async with self.bot.session.get(url) as req:
+                    pfp = await req.read()
+                card = await self.rank_card(pfp, member, info)
+
+        data, fmt = card
+        yield discord.File(fp=BytesIO(data), filename=f"jaydumb.{fmt}")  # thanks jay
+
+        if rendered:
+            await self.cards.put(key, data, fmt)
@@ -1,2 +1,9 @@
 DEFAULT_XP_COOLDOWN = 60
 DEFAULT_XP_REWARD_RANGE = (15, 25)
+DEFAULT_XP_FLUSH_INTERVAL = 5.0
+DEFAULT_XP_FLUSH_SIZE = 1000
+DEFAULT_PLAYER_CACHE_SIZE = 10000
+DEFAULT_PLAYER_CACHE_TTL = 300.0
+DEFAULT_CARD_BUCKETS = 20
+DEFAULT_CARD_CACHE_MEMORY = 32 * 1024 * 1024
+DEFAULT_CARD_CACHE_DISK = 512 * 1024 * 1024
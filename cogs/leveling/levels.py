@@ -0,0 +1,70 @@
+import math
+from bisect import bisect_right
+from typing import Iterable, Tuple
+
+import numpy
+
+__all__ = ("level_xp", "total_xp", "level_from_xp", "progress", "levels_from_xp")
+
+# levels up to here are looked up, anything above is solved for
+TABLE_LEVELS = 1000
+
+
+def level_xp(level: int) -> int:
+    """XP it takes to go from ``level`` to the next one"""
+    return 5 * level * level + 50 * level + 100
+
+
+def total_xp(level: int) -> int:
+    """XP it takes to reach ``level``, the sum of :func:`level_xp` below it"""
+    return (10 * level**3 + 135 * level**2 + 455 * level) // 6
+
+
+# TOTALS[n] == total_xp(n)
+TOTALS = [total_xp(n) for n in range(TABLE_LEVELS + 1)]
+_TOTALS = numpy.array(TOTALS, dtype=numpy.int64)
+
+
+def _solve(xp: int) -> int:
+    """
+    The level ``xp`` reaches, from the real root of ``total_xp(L) = xp``.
+    Shifting ``L = t - 4.5`` leaves ``t^3 + pt + q = 0`` with ``p < 0``,
+    whose largest root has a trigonometric (or hyperbolic) closed form. The
+    float estimate is then settled against the exact integer totals.
+    """
+    p, q = -15.25, -(22.5 + 0.6 * xp)
+    r = 2 * math.sqrt(-p / 3)
+    x = 3 * q / (2 * p) * math.sqrt(-3 / p)
+    if x >= 1:
+        t = r * math.cosh(math.acosh(x) / 3)
+    else:
+        t = r * math.cos(math.acos(x) / 3)
+    level = max(0, int(t - 4.5))
+    while total_xp(level + 1) <= xp:
+        level += 1
+    while level and total_xp(level) > xp:
+        level -= 1
+    return level
+
+
+def level_from_xp(xp: int) -> int:
+    xp = int(xp)
+    if xp < TOTALS[-1]:
+        return max(bisect_right(TOTALS, xp) - 1, 0)
+    return _solve(xp)
+
+
+def progress(xp: int) -> Tuple[int, int, int]:
+    """``(level, xp earned into it, xp the level takes)``"""
+    level = level_from_xp(xp)
+    return level, int(xp) - total_xp(level), level_xp(level)
+
+
+def levels_from_xp(xps: Iterable[int]) -> numpy.ndarray:
+    """:func:`level_from_xp` of many totals at once, e.g. a leaderboard page"""
+    xps = numpy.asarray(xps, dtype=numpy.int64)
+    levels = numpy.maximum(numpy.searchsorted(_TOTALS, xps, side="right") - 1, 0)
+    beyond = numpy.flatnonzero(xps >= _TOTALS[-1])
+    for i in beyond:
+        levels.flat[i] = _solve(int(xps.flat[i]))
+    return levels
@@ -1,39 +1,131 @@
-import redis
-import discord
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 
-lvls_xp = [5 * (i ** 2) + 50 * i + 100 for i in range(200)]
+from ink.utils import RedisPool
+from .levels import level_from_xp
 
 
-def get_level_from_xp(xp):
-    remaining_xp = int(xp)
-    lvl = 0
-    while remaining_xp >= lvls_xp[lvl]:
-        remaining_xp -= lvls_xp[lvl]
-        lvl += 1
-    return lvl
+class Player:
+    """
+    One member's standing in one guild. ``xp``, ``level`` and ``rank`` are
+    cached by :meth:`refresh`; ``dirty`` is set when the xp changes locally
+    after that, as the rank may have moved with it.
+    """
 
+    __slots__ = (
+        "member_id",
+        "guild_id",
+        "xp",
+        "level",
+        "rank",
+        "dirty",
+        "expires",
+        "_storage",
+    )
 
-class Player:
-    def __init__(
-        self, member: discord.Object, guild: discord.Object, redis: redis.StrictRedis
-    ):
-        self.member_id: int = member.id
-        self.guild_id: int = guild.id
-        self.key = f"lb:{self.guild_id}"
+    def __init__(self, member_id: int, guild_id: int, redis: RedisPool):
+        self.member_id = member_id
+        self.guild_id = guild_id
         self._storage = redis
+        self.xp: Optional[int] = None
+        self.level: Optional[int] = None
+        self.rank: Optional[int] = None
+        self.dirty = False
+        self.expires = 0.0
 
     @property
-    def lvl(self) -> int:
-        return get_level_from_xp(self.xp)
+    def key(self) -> str:
+        return f"lb:{self.guild_id}"
 
     @property
-    def rank(self) -> int:
-        return int(self._storage.zrevrank(self.key, "{}:xp".format(self.member_id))) + 1
+    def field(self) -> str:
+        return f"{self.member_id}:xp"
 
     @property
-    def xp(self) -> int:
-        return int(self._storage.zscore(self.key, "{}:xp".format(self.member_id)) or 0)
+    def stale(self) -> bool:
+        return self.dirty or self.xp is None or self.expires <= time.monotonic()
+
+    def update(self, xp: int):
+        self.xp = xp
+        self.level = level_from_xp(xp)
+        self.dirty = True
+
+    async def refresh(self, ttl: float, unflushed: int = 0):
+        """Reads xp and rank in one round trip, ``unflushed`` xp added on top"""
+        pipe = self._storage.pipeline()
+        pipe.zscore(self.key, self.field)
+        pipe.zrevrank(self.key, self.field)
+        score, rank = await pipe.execute()
+        self.update(int(float(score or 0)) + unflushed)
+        self.rank = None if rank is None else int(rank) + 1
+        self.dirty = False
+        self.expires = time.monotonic() + ttl
+
+
+class PlayerCache:
+    """
+    LRU of :class:`Player` records keyed by ``(guild id, member id)``,
+    holding at most ``maxsize``; cached values older than ``ttl`` seconds
+    are read again. Members who only chat never get a record, see
+    :meth:`peek`, so memory stays flat however many members the bot sees.
+    """
+
+    def __init__(self, redis: RedisPool, maxsize: int = 10000, ttl: float = 300.0):
+        self.redis = redis
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[int, int], Player]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, guild_id: int, member_id: int) -> Player:
+        ident = (guild_id, member_id)
+        player = self._entries.get(ident)
+        if player is not None and not player.stale:
+            self._entries.move_to_end(ident)
+            self.hits += 1
+            return player
+
+        self.misses += 1
+        if player is None:
+            player = self._entries[ident] = Player(member_id, guild_id, self.redis)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._entries.move_to_end(ident)
+        return player
+
+    def peek(self, guild_id: int, member_id: int) -> Optional[Player]:
+        """The cached record, if any, without counting or refreshing it"""
+        return self._entries.get((guild_id, member_id))
+
+    def evict_guild(self, guild_id: int):
+        for ident in [ident for ident in self._entries if ident[0] == guild_id]:
+            del self._entries[ident]
+
+    def clear(self):
+        self._entries.clear()
 
-    @xp.setter
-    def xp(self, xp) -> int:
-        return self._storage.zadd(self.key, {"{}:xp".format(self.member_id): xp})
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        # a sample is enough, every record has the same shape
+        sample = next(iter(self._entries.items()), None)
+        per_entry = (
+            sum(map(sys.getsizeof, (sample[0], sample[1], *sample[0]))) if sample else 0
+        )
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes": sys.getsizeof(self._entries) + per_entry * len(self._entries),
+        }
@@ -158,7 +158,8 @@ class Moderation(Cog):
             return
         key = f"storage:{self.qualified_name}:{ctx.guild.id}"
 
-        await self.bot.redis.set(
+        ctx.batch.write(
+            "set",
             key + f"message:{ctx.message.id}",
             orjson.dumps(
                 {
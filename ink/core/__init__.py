@@ -1,3 +1,4 @@
 from .command import *
 from .bot import *
 from .context import *
+from .prefix import *
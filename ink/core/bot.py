@@ -1,26 +1,27 @@
 import importlib
 import inspect
-import io
 import logging
 import sys
 import traceback
-import aioredis
 import discord
 from discord.ext import commands
 from discord.ext.commands import errors
 from discord.ext.commands.bot import _is_submodule
 from discord.ext.colors import XKCDColor
-from jishaku.functools import AsyncSender
-from jishaku.paginators import PaginatorInterface, WrappedPaginator
-from jishaku.repl import AsyncCodeExecutor
-from jishaku.repl.scope import Scope
-from jishaku.shim.paginator_170 import PaginatorEmbedInterface
-from ink.utils import RedisDict
-from .context import Context
+from ink.utils import (
+    CachedRedisDict,
+    MetricsRegistry,
+    MetricsServer,
+    RedisDict,
+    RedisPool,
+    StorageCache,
+)
+from .context import Context, MessageEvent
+from .output import OutputDispatcher
+from .prefix import PrefixMatcher
 import locale
 import os
 import aiohttp
-import redis
 
 locale.setlocale(locale.LC_ALL, "en_US.UTF-8")
 __all__ = ("SquidBot",)
@@ -41,12 +42,23 @@ class SquidBot(commands.AutoShardedBot):
 
         # databases
         self.redis = None
-        self.sync_redis = None
+        self.storage_cache = None
+
+        # collectors registered by cogs, served when "metrics-port" is set
+        self.metrics = MetricsRegistry()
+        self.metrics_server = None
+
+        # coroutine functions awaited on close, while redis is still connected
+        self.shutdown_hooks = []
 
         # aiohttp session for downloading
         self.session = None  #
-        # scope for jsk
-        self.scope = Scope()
+        # renderers for values yielded by commands
+        self.output = OutputDispatcher(self)
+        self.last_result = None
+
+        # compiled lazily from command_prefix, see prefix_matcher
+        self._prefix_matcher = None
 
         super().__init__(
             allowed_mentions=discord.AllowedMentions.none(),
@@ -72,52 +84,78 @@ class SquidBot(commands.AutoShardedBot):
             v: k for v, k in self.cogs.items() if v.lower() in self.config["plugins"]
         }
 
+    @property
+    def prefix_matcher(self):
+        if self._prefix_matcher is None:
+            if callable(self.command_prefix):
+                # dynamic prefixes can't be precompiled, every message is a candidate
+                self._prefix_matcher = lambda _: True
+            else:
+                mention = self.config.get("mention-prefix", False) and self.user
+                self._prefix_matcher = PrefixMatcher(
+                    self.command_prefix, user_id=mention.id if mention else None
+                )
+        return self._prefix_matcher
+
+    async def get_prefix(self, message):
+        prefix = await super().get_prefix(message)
+        if self.config.get("mention-prefix", False):
+            prefix = commands.when_mentioned_or(
+                *([prefix] if isinstance(prefix, str) else prefix)
+            )(self, message)
+        return prefix
+
     def storage(self, plugin_name: str, guild_id: int):
-        return RedisDict(self.redis, prefix=f"storage:{plugin_name}:{guild_id}")
+        prefix = f"storage:{plugin_name}:{guild_id}"
+        if self.storage_cache is not None:
+            return CachedRedisDict(self.redis, prefix=prefix, cache=self.storage_cache)
+        return RedisDict(self.redis, prefix=prefix)
 
     async def create(self):
-        uri = os.getenv("redishost", self.config.get("redis-uri"))
         if self.redis is None:
-            print("connecting to redis")
-
-            self.redis = await aioredis.create_redis(
-                uri, encoding="utf8", loop=self.loop
+            self.log.info("connecting to redis")
+
+            self.redis = await RedisPool(
+                os.getenv("redishost", self.config.get("redis-uri")),
+                minsize=self.config.get("redis-pool-minsize", 1),
+                maxsize=self.config.get("redis-pool-size", 10),
+                timeout=self.config.get("redis-timeout", 5.0),
+                health_check_interval=self.config.get(
+                    "redis-health-check-interval", 30.0
+                ),
+            ).connect(loop=self.loop)
+
+        cache = self.config.get("storage-cache", False)
+        if cache and self.storage_cache is None:
+            # opt-in, guild config is then read from memory in the hot path
+            self.storage_cache = StorageCache(
+                self.redis, maxsize=cache if type(cache) is int else 2048
             )
-            await self.redis.ping()
-
-        if self.sync_redis is None:
-            print("connecting to sync redis")
-
-            if uri.startswith("redis://"):
-                uri = uri[8:]
-
-            if uri == "squid-redis.default.svc.cluster.local":  # k8s deployment
-                self.sync_redis = redis.StrictRedis(uri, decode_responses=True)
-                self.sync_redis.ping()
-            else:
-                hostport, *options = uri.split(",")  # ty stackoverflow
-                host, _, port = hostport.partition(":")
-                arguments = {}
-                for option in options:
-                    opt, _, value = option.partition("=")
-                    if opt == "port":
-                        value = int(value)
-                    elif opt == "ssl":
-                        value = value.lower() == "true"
-                    elif opt == "abortConnect":
-                        continue
-                    arguments[opt] = value
-                self.sync_redis = redis.StrictRedis(
-                    host, port=int(port), decode_responses=True, **arguments
-                )
-
-                self.sync_redis.ping()
+            await self.storage_cache.start(loop=self.loop)
 
         if self.session is None:
             self.session = aiohttp.ClientSession(loop=self.loop)
 
+        port = self.config.get("metrics-port")
+        if port and self.metrics_server is None:
+            self.metrics_server = MetricsServer(
+                self.metrics, self.config.get("metrics-host", "0.0.0.0"), port
+            )
+            await self.metrics_server.start()
+
     async def close(self):
+        for hook in self.shutdown_hooks[:]:
+            try:
+                await hook()
+            except Exception:
+                self.log.exception("shutdown hook %r failed", hook)
         await self.session.close()
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        if self.storage_cache is not None:
+            await self.storage_cache.stop()
+        if self.redis is not None:
+            await self.redis.close()
         return await super().close()
 
     def load_extension(self, name, *, package=None):
@@ -220,6 +258,7 @@ class SquidBot(commands.AutoShardedBot):
 
     async def on_ready(self) -> None:
         await self.create()
+        self._prefix_matcher = None  # user is known now, recompile mentions
         self.log.info(
             "Connected!\n"
             + "\n".join(
@@ -268,6 +307,10 @@ class SquidBot(commands.AutoShardedBot):
         # await super(self, commands.AutoShardedBot).invoke(ctx)
 
     async def on_message(self, message: discord.Message) -> None:
+        if not self.prefix_matcher(message.content):
+            # ordinary chat, listeners don't need a full invocation context
+            self.dispatch("context", MessageEvent(self, message))
+            return
 
         ctx = await self.get_context(message, cls=Context)
         self.dispatch("context", ctx)
@@ -276,130 +319,10 @@ class SquidBot(commands.AutoShardedBot):
             await self.process_output(ctx, coro)
 
     async def process_output(self, ctx: commands.Context, coro):
-
-        cmd = "async for _yield in coro:\n yield _yield"
-        arg_dict = {"coro": coro}
-
-        scope = self.scope
-
-        executor = AsyncCodeExecutor(cmd, scope, arg_dict=arg_dict)
-        async for send, result in AsyncSender(executor):
-
+        dispatch = self.output.dispatch
+        async for result in coro:
             if result is None:
                 continue
 
             self.last_result = result
-            kwargs = {"mention_author": self.mention_author}
-            perms = ctx.channel.permissions_for(ctx.me)
-            if isinstance(result, discord.File):
-                kwargs["file"] = result
-            elif isinstance(result, PaginatorInterface):
-                send(await result.send_to(ctx))
-                continue
-            elif isinstance(result, WrappedPaginator):
-                if perms.embed_links or not perms.send_messages:
-                    p = PaginatorEmbedInterface(ctx.bot, result, owner=ctx.author)
-                else:
-                    p = PaginatorInterface(ctx.bot, result, owner=ctx.author)
-
-                if perms.send_messages:
-                    await p.send_to(ctx)
-                else:
-                    await p.send_to(ctx.author)
-                continue
-
-            elif (
-                isinstance(result, discord.Embed)
-                and ctx.channel.permissions_for(ctx.me).embed_links
-            ):
-                kwargs["embed"] = result
-            else:
-                o_embed = None
-                if isinstance(result, discord.Embed):
-                    o_embed = result
-                    result = result.description
-                if not isinstance(result, str):
-                    # repr all non-strings
-                    result = repr(result)
-
-                if len(result) <= 4050:
-                    if result.strip() == "":
-                        result = "\u200b"
-                    perms = ctx.channel.permissions_for(ctx.me)
-                    if not perms.send_messages:
-                        kwargs["embed"] = o_embed or discord.Embed(
-                            description=result.replace(
-                                self.http.token, "[token omitted]"
-                            ),
-                            color=self.color,
-                        )
-                    else:
-
-                        if not perms.embed_links:
-                            kwargs["content"] = result
-                        else:
-                            kwargs["embed"] = discord.Embed(
-                                description=result.replace(
-                                    self.http.token, "[token omitted]"
-                                ),
-                                color=self.color,
-                            )
-                elif len(result) < 50_000:  # File "full content" preview limit
-                    # Discord's desktop and web client now supports an interactive file content
-                    #  display for files encoded in UTF-8.
-                    # Since this avoids escape issues and is more intuitive than pagination for
-                    #  long results, it will now be prioritized over PaginatorInterface if the
-                    #  resultant content is below the filesize threshold
-                    kwargs["file"] = discord.File(
-                        filename="output.py",
-                        fp=io.BytesIO(result.encode("utf-8")),
-                    )
-
-                else:
-                    # inconsistency here, results get wrapped in codeblocks when they are too large
-                    #  but don't if they're not. probably not that bad, but noting for later review
-                    paginator = WrappedPaginator(
-                        prefix="```py", suffix="```", max_size=1985
-                    )
-
-                    paginator.add_line(result)
-
-                    interface = PaginatorInterface(ctx.bot, paginator, owner=ctx.author)
-
-                    send(await interface.send_to(ctx))
-                    continue
-
-            if kwargs:
-                dm = False
-                missing = []
-                # checks
-                p = ctx.channel.permissions_for(ctx.me)
-                if not p.send_messages:
-                    dm = True
-                    missing.append("- Send Messages")
-                if kwargs.get("file") and not p.attach_files:
-                    dm = True
-                    missing.append("- Attach Files")
-                if kwargs.get("embed") and not p.embed_links:
-                    dm = True
-                    missing.append("- Embeds")
-
-                if dm:
-                    if p.add_reactions:
-                        try:
-                            await ctx.message.add_reaction("‼️")
-                        except:
-                            pass
-                    kwargs["content"] = (
-                        "**Missing Permissions**\n```diff\n"
-                        + "\n".join(missing)
-                        + "\n```\n"
-                        + kwargs.get("content", "")
-                    )
-                    dest = ctx.author.send
-                else:
-                    dest = ctx.reply
-
-                send(await dest(**kwargs))
-
-        scope.clear_intersection(arg_dict)
+            await dispatch(ctx, result)
@@ -3,11 +3,11 @@ import functools
 import inspect
 from typing import Optional
 
-from discord.ext.commands import Command, CommandError, CommandInvokeError
+from discord.ext.commands import Command, CommandError, CommandInvokeError, GroupMixin
 from discord.ext.commands._types import _BaseCommand
 from discord.ext.commands.cooldowns import BucketType, CooldownMapping
 
-__all__ = ("SquidCommand", "squidcommand")
+__all__ = ("SquidCommand", "SquidGroup", "squidcommand", "squidgroup")
 
 
 def hooked_wrapped_callback(command, ctx, coro):
@@ -150,6 +150,76 @@ class SquidCommand(Command):
             return resp
 
 
+async def _invoke(command, ctx):
+    # subcommands may be plain discord.py commands, which aren't generators
+    resp = command.invoke(ctx)
+    if inspect.iscoroutine(resp):
+        yield await resp
+    else:
+        async for _yield in resp:
+            yield _yield
+
+
+class SquidGroup(GroupMixin, SquidCommand):
+    """
+    A :class:`SquidCommand` with subcommands, invoked like
+    :class:`discord.ext.commands.Group` but yielding the output of the group
+    callback and the subcommand.
+    """
+
+    def __init__(self, *args, **attrs):
+        self.invoke_without_command = attrs.pop("invoke_without_command", False)
+        super().__init__(*args, **attrs)
+
+    def command(self, *args, **kwargs):
+        kwargs.setdefault("cls", SquidCommand)
+        return super().command(*args, **kwargs)
+
+    def group(self, *args, **kwargs):
+        kwargs.setdefault("cls", SquidGroup)
+        return super().group(*args, **kwargs)
+
+    def copy(self):
+        ret = super().copy()
+        for cmd in self.commands:
+            ret.add_command(cmd.copy())
+        return ret
+
+    async def invoke(self, ctx) -> Optional[dict]:
+        ctx.invoked_subcommand = None
+        ctx.subcommand_passed = None
+        early_invoke = not self.invoke_without_command
+        if early_invoke:
+            await self.prepare(ctx)
+
+        view = ctx.view
+        previous = view.index
+        view.skip_ws()
+        trigger = view.get_word()
+
+        if trigger:
+            ctx.subcommand_passed = trigger
+            ctx.invoked_subcommand = self.all_commands.get(trigger, None)
+
+        if early_invoke:
+            injected = hooked_wrapped_callback(self, ctx, self.callback)
+            async for _yield in injected(*ctx.args, **ctx.kwargs):
+                yield _yield
+
+        ctx.invoked_parents.append(ctx.invoked_with)
+
+        if trigger and ctx.invoked_subcommand:
+            ctx.invoked_with = trigger
+            async for _yield in _invoke(ctx.invoked_subcommand, ctx):
+                yield _yield
+        elif not early_invoke:
+            # undo the trigger parsing
+            view.index = previous
+            view.previous = previous
+            async for _yield in super().invoke(ctx):
+                yield _yield
+
+
 def squidcommand(name=None, cls=SquidCommand, **attrs):
     def decorator(func):
         if isinstance(func, Command):
@@ -157,3 +227,7 @@ def squidcommand(name=None, cls=SquidCommand, **attrs):
         return cls(func, name=name, **attrs)
 
     return decorator
+
+
+def squidgroup(name=None, cls=SquidGroup, **attrs):
+    return squidcommand(name, cls=cls, **attrs)
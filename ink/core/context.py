@@ -1,8 +1,8 @@
 from discord.ext.commands import context
-from ..utils import RedisDict
+from ..utils import RedisBatch
 
 
-__all__ = ("Context",)
+__all__ = ("Context", "MessageEvent")
 
 
 class Context(context.Context):
@@ -10,12 +10,66 @@ class Context(context.Context):
         super(Context, self).__init__(**kwargs)
 
         self._storage = None
+        self._batch = None
+        # per-message data shared by listeners, e.g. AutoMod's message features
+        self._features = None
+        self._scope = None
+
+    @property
+    def batch(self):
+        """Pipelines the Redis reads and writes of every listener for this message"""
+        if self._batch is None:
+            self._batch = RedisBatch(self.bot.redis, loop=self.bot.loop)
+        return self._batch
 
     @property
     def storage(self):
         if self._storage is None:
-            self._storage = RedisDict(
-                self.bot.redis,
-                prefix=f'storage:{self.cog.qualified_name if self.cog else "cog"}:{self.guild.id if self.guild else self.channel.id}',
+            self._storage = self.bot.storage(
+                self.cog.qualified_name if self.cog else "cog",
+                self.guild.id if self.guild else self.channel.id,
             )
         return self._storage
+
+
+class MessageEvent:
+    """
+    Lightweight stand-in for :class:`Context` that ``on_context`` listeners
+    receive for messages that can't be commands.
+    """
+
+    __slots__ = ("bot", "message", "_storage", "_batch", "_features", "_scope")
+
+    prefix = None
+    command = None
+    invoked_with = None
+    cog = None
+    valid = False
+
+    def __init__(self, bot, message):
+        self.bot = bot
+        self.message = message
+        self._storage = None
+        self._batch = None
+        self._features = None
+        self._scope = None
+
+    @property
+    def author(self):
+        return self.message.author
+
+    @property
+    def guild(self):
+        return self.message.guild
+
+    @property
+    def channel(self):
+        return self.message.channel
+
+    @property
+    def me(self):
+        guild = self.message.guild
+        return guild.me if guild is not None else self.bot.user
+
+    batch = Context.batch
+    storage = Context.storage
@@ -0,0 +1,172 @@
+import io
+from typing import Any, Callable, Dict, Optional
+
+import discord
+from jishaku.paginators import PaginatorInterface, WrappedPaginator
+from jishaku.shim.paginator_170 import PaginatorEmbedInterface
+
+__all__ = ("OutputDispatcher",)
+
+
+class OutputDispatcher:
+    """
+    Routes values yielded by command generators to a renderer for their type.
+
+    Renderers are looked up through the value's MRO once per type and cached,
+    so dispatching a value costs a single dict lookup on the hot path. A
+    renderer returns the keyword arguments for the reply, or None if it
+    already handled sending itself (paginators).
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._renderers: Dict[type, Callable] = {}
+        self._resolved: Dict[type, Callable] = {}
+
+        self.register(object)(self.render_object)
+        self.register(str)(self.render_text)
+        self.register(discord.Embed)(self.render_embed)
+        self.register(discord.File)(self.render_file)
+        self.register(PaginatorInterface)(self.render_interface)
+        self.register(WrappedPaginator)(self.render_paginator)
+
+    def register(self, *types: type):
+        def decorator(func):
+            for cls in types:
+                self._renderers[cls] = func
+            self._resolved.clear()
+            return func
+
+        return decorator
+
+    def resolve(self, cls: type) -> Callable:
+        try:
+            return self._resolved[cls]
+        except KeyError:
+            pass
+
+        for base in cls.__mro__:
+            if base in self._renderers:
+                renderer = self._renderers[base]
+                break
+        else:
+            renderer = self._renderers[object]
+        self._resolved[cls] = renderer
+        return renderer
+
+    async def dispatch(self, ctx, result: Any) -> None:
+        if result is None:
+            return
+
+        kwargs = await self.resolve(type(result))(ctx, result)
+        if kwargs:
+            await self.send(ctx, kwargs)
+
+    # renderers
+
+    async def render_object(self, ctx, result: Any) -> Optional[dict]:
+        # repr all non-strings
+        return await self.render_text(ctx, repr(result))
+
+    async def render_file(self, ctx, result: discord.File) -> Optional[dict]:
+        return {"mention_author": self.bot.mention_author, "file": result}
+
+    async def render_embed(self, ctx, result: discord.Embed) -> Optional[dict]:
+        if ctx.channel.permissions_for(ctx.me).embed_links:
+            return {"mention_author": self.bot.mention_author, "embed": result}
+        return await self.render_text(ctx, result.description, o_embed=result)
+
+    async def render_interface(self, ctx, result: PaginatorInterface) -> None:
+        await result.send_to(ctx)
+
+    async def render_paginator(self, ctx, result: WrappedPaginator) -> None:
+        perms = ctx.channel.permissions_for(ctx.me)
+        if perms.embed_links or not perms.send_messages:
+            p = PaginatorEmbedInterface(ctx.bot, result, owner=ctx.author)
+        else:
+            p = PaginatorInterface(ctx.bot, result, owner=ctx.author)
+
+        if perms.send_messages:
+            await p.send_to(ctx)
+        else:
+            await p.send_to(ctx.author)
+
+    async def render_text(
+        self, ctx, result: str, o_embed: discord.Embed = None
+    ) -> Optional[dict]:
+        if not isinstance(result, str):
+            result = repr(result)
+
+        kwargs = {"mention_author": self.bot.mention_author}
+        if len(result) <= 4050:
+            if result.strip() == "":
+                result = "\u200b"
+            perms = ctx.channel.permissions_for(ctx.me)
+            if not perms.send_messages:
+                kwargs["embed"] = o_embed or discord.Embed(
+                    description=result.replace(self.bot.http.token, "[token omitted]"),
+                    color=self.bot.color,
+                )
+            elif not perms.embed_links:
+                kwargs["content"] = result
+            else:
+                kwargs["embed"] = discord.Embed(
+                    description=result.replace(self.bot.http.token, "[token omitted]"),
+                    color=self.bot.color,
+                )
+        elif len(result) < 50_000:  # File "full content" preview limit
+            # Discord's desktop and web client now supports an interactive file content
+            #  display for files encoded in UTF-8.
+            # Since this avoids escape issues and is more intuitive than pagination for
+            #  long results, it will now be prioritized over PaginatorInterface if the
+            #  resultant content is below the filesize threshold
+            kwargs["file"] = discord.File(
+                filename="output.py",
+                fp=io.BytesIO(result.encode("utf-8")),
+            )
+        else:
+            # inconsistency here, results get wrapped in codeblocks when they are too large
+            #  but don't if they're not. probably not that bad, but noting for later review
+            paginator = WrappedPaginator(prefix="```py", suffix="```", max_size=1985)
+            paginator.add_line(result)
+
+            interface = PaginatorInterface(ctx.bot, paginator, owner=ctx.author)
+            await interface.send_to(ctx)
+            return None
+
+        return kwargs
+
+    # sending
+
+    async def send(self, ctx, kwargs: dict):
+        dm = False
+        missing = []
+        # checks
+        p = ctx.channel.permissions_for(ctx.me)
+        if not p.send_messages:
+            dm = True
+            missing.append("- Send Messages")
+        if kwargs.get("file") and not p.attach_files:
+            dm = True
+            missing.append("- Attach Files")
+        if kwargs.get("embed") and not p.embed_links:
+            dm = True
+            missing.append("- Embeds")
+
+        if dm:
+            if p.add_reactions:
+                try:
+                    await ctx.message.add_reaction("‼️")
+                except:
+                    pass
+            kwargs["content"] = (
+                "**Missing Permissions**\n```diff\n"
+                + "\n".join(missing)
+                + "\n```\n"
+                + kwargs.get("content", "")
+            )
+            dest = ctx.author.send
+        else:
+            dest = ctx.reply
+
+        return await dest(**kwargs)
@@ -0,0 +1,41 @@
+from typing import Iterable, Optional, Union
+
+__all__ = ("PrefixMatcher",)
+
+
+class PrefixMatcher:
+    """
+    Decides whether a message could be a command without building a Context.
+
+    The prefixes are compiled once into a tuple for ``str.startswith`` plus the
+    set of their first characters, so ordinary chat is rejected after looking
+    at a single character and a candidate costs at most O(prefix length).
+    """
+
+    __slots__ = ("prefixes", "_heads", "_always")
+
+    def __init__(
+        self, prefixes: Union[str, Iterable[str]], *, user_id: Optional[int] = None
+    ):
+        if isinstance(prefixes, str):
+            prefixes = [prefixes]
+        prefixes = list(prefixes)
+        if user_id is not None:
+            prefixes += [f"<@{user_id}>", f"<@!{user_id}>"]
+
+        self.prefixes = tuple(sorted(set(prefixes), key=len, reverse=True))
+        # an empty prefix means every message is a candidate
+        self._always = "" in self.prefixes
+        self._heads = frozenset(p[0] for p in self.prefixes if p)
+
+    def __call__(self, content: str) -> bool:
+        if self._always:
+            return True
+        return (
+            bool(content)
+            and content[0] in self._heads
+            and content.startswith(self.prefixes)
+        )
+
+    def __repr__(self) -> str:
+        return f"<PrefixMatcher prefixes={self.prefixes!r}>"
@@ -2,4 +2,6 @@ from .converters import *
 from .paginators import *
 from .embeds import *
 from .db import *
+from .resolver import *
+from .metrics import *
 from .decorators import *
\ No newline at end of file
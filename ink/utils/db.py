@@ -1,9 +1,201 @@
 import asyncio
-from typing import List, Optional, Tuple, Union
+import hashlib
+import logging
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+import aioredis
 import orjson
 from discord.ext import commands
 
-__all__ = ("get_storage", "get_config", "RedisStorage", "RedisDict")
+__all__ = (
+    "get_storage",
+    "get_config",
+    "RedisPool",
+    "RedisScript",
+    "RedisStorage",
+    "RedisDict",
+    "RedisBatch",
+    "StorageCache",
+    "CachedRedisDict",
+)
+
+log = logging.getLogger(__name__)
+
+
+class RedisPool:
+    """
+    The bot's single asyncio Redis client.
+
+    Commands are proxied to an aioredis connection pool and bounded by a
+    per-command timeout, and a background task pings the server every
+    ``health_check_interval`` seconds so a dead connection shows up in the
+    logs instead of as a stalled listener.
+    """
+
+    # commands that block server side or don't return a reply to wait for
+    UNTIMED = frozenset(
+        (
+            "pipeline",
+            "multi_exec",
+            "blpop",
+            "brpop",
+            "brpoplpush",
+            "bzpopmin",
+            "bzpopmax",
+            "xread",
+            "xread_group",
+            "subscribe",
+            "psubscribe",
+            "unsubscribe",
+            "punsubscribe",
+            "iscan",
+            "ihscan",
+            "isscan",
+            "izscan",
+        )
+    )
+
+    def __init__(
+        self,
+        address: str,
+        *,
+        minsize: int = 1,
+        maxsize: int = 10,
+        timeout: Optional[float] = 5.0,
+        connect_timeout: Optional[float] = None,
+        health_check_interval: Optional[float] = 30.0,
+        encoding: Optional[str] = "utf8",
+    ):
+        if "://" not in address:
+            address = "redis://" + address
+        self.address = address
+        self.minsize = minsize
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.health_check_interval = health_check_interval
+        self.encoding = encoding
+        self.healthy = False
+
+        self._redis = None
+        self._health_task = None
+
+    async def connect(self, loop=None):
+        loop = loop or asyncio.get_event_loop()
+        self._redis = await aioredis.create_redis_pool(
+            self.address,
+            minsize=self.minsize,
+            maxsize=self.maxsize,
+            timeout=self.connect_timeout,
+            encoding=self.encoding,
+        )
+        await self.ping()
+        self.healthy = True
+
+        if self.health_check_interval:
+            self._health_task = loop.create_task(self._health_check())
+        return self
+
+    async def _health_check(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await asyncio.wait_for(self._redis.ping(), self.timeout)
+            except (asyncio.TimeoutError, aioredis.RedisError, OSError) as exc:
+                if self.healthy:
+                    log.warning("redis health check failed: %r", exc)
+                self.healthy = False
+            else:
+                if not self.healthy:
+                    log.info("redis connection recovered")
+                self.healthy = True
+
+    def __getattr__(self, name):
+        if name.startswith("_") or self._redis is None:
+            raise AttributeError(name)
+        attr = getattr(self._redis, name)
+        if not callable(attr) or name in self.UNTIMED or self.timeout is None:
+            return attr
+
+        def command(*args, **kwargs):
+            reply = attr(*args, **kwargs)
+            if asyncio.isfuture(reply) or asyncio.iscoroutine(reply):
+                return asyncio.wait_for(reply, self.timeout)
+            return reply
+
+        return command
+
+    async def exclusive(self):
+        """
+        A client bound to one connection taken out of the pool, for blocking
+        commands that would otherwise stall everything queued behind them::
+
+            with await redis.exclusive() as conn:
+                await conn.xread_group(...)
+        """
+        return await self._redis
+
+    def __repr__(self) -> str:
+        return (
+            f"<RedisPool address={self.address!r} size={self.minsize}-{self.maxsize}>"
+        )
+
+    async def close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        if self._redis is not None:
+            self._redis.close()
+            await self._redis.wait_closed()
+
+
+class RedisScript:
+    """
+    A Lua script that is sent once and then run by its SHA1.
+
+    Falls back to EVAL, which also caches the script server side, when the
+    server doesn't know the SHA yet (first call, restart, SCRIPT FLUSH).
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.sha = hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    async def __call__(self, redis, keys=(), args=()):
+        keys, args = list(keys), list(args)
+        try:
+            return await redis.evalsha(self.sha, keys=keys, args=args)
+        except aioredis.ReplyError as exc:
+            if not str(exc).startswith("NOSCRIPT"):
+                raise
+        return await redis.eval(self.source, keys=keys, args=args)
+
+    async def run_many(self, redis, calls) -> list:
+        """
+        Runs the script once per ``(keys, args)`` in ``calls`` in a single
+        pipeline and returns the replies in order; errors are returned, not
+        raised.
+        """
+        calls = [(list(keys), list(args)) for keys, args in calls]
+        pipe = redis.pipeline()
+        for keys, args in calls:
+            pipe.evalsha(self.sha, keys=keys, args=args)
+        results = await pipe.execute(return_exceptions=True)
+
+        missing = [
+            i
+            for i, result in enumerate(results)
+            if isinstance(result, aioredis.ReplyError)
+            and str(result).startswith("NOSCRIPT")
+        ]
+        if missing:
+            pipe = redis.pipeline()
+            for i in missing:
+                pipe.eval(self.source, keys=calls[i][0], args=calls[i][1])
+            for i, result in zip(missing, await pipe.execute(return_exceptions=True)):
+                results[i] = result
+        return results
 
 
 class RedisStorage:
@@ -100,43 +292,55 @@ class RedisStorage:
 
 
 class RedisDict(object):
-    def __init__(self, redis, prefix):
-        self.pipe = redis.pipeline()
+    """
+    A Redis hash exposed as an async mapping.
+
+    Keys and values are stored as JSON. Inside ``async with`` every command is
+    queued on a pipeline that is executed on exit, otherwise each call is its
+    own round trip. Bulk reads (``items``, ``values``, ``get_many``) cost a
+    single command regardless of the size of the hash, and ``async for``
+    walks very large hashes incrementally with HSCAN.
+    """
+
+    cached = False
+
+    def __init__(self, redis, prefix, scan_count: int = 500):
         self._redis_class = redis
         self._redis = redis
         self._result = None
         self._prefix = prefix
+        self.scan_count = scan_count
 
     async def __aenter__(self):
-        self._redis = self.pipe
+        self._redis = self._redis_class.pipeline()
         return self
 
     async def __aexit__(self, *a):
-        print(a)
-        if self._redis:
-            self._result = await self._redis.execute()
-            self._redis = self._redis_class
-            self.pipe = self._redis.pipeline()
+        pipe, self._redis = self._redis, self._redis_class
+        self._result = await pipe.execute()
+
+    @property
+    def prefix(self) -> str:
+        return self._prefix
 
     @property
     def result(self):
         return self._result
 
     @staticmethod
-    def _loads(value, l=False):
-        if type(value) not in (list, tuple):
-            value = [value]
-            l = True
-        for p, v in enumerate(value[:]):
-            try:
-                value[p] = orjson.loads(v)
-            except orjson.JSONDecodeError:
-
-                value[p] = v.decode("utf-8") if v else v
-        if not l:
-            return value
-        else:
-            return value[0]
+    def _load(value):
+        if value is None:
+            return None
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    @classmethod
+    def _loads(cls, value):
+        if type(value) in (list, tuple):
+            return [cls._load(v) for v in value]
+        return cls._load(value)
 
     @staticmethod
     def _dumps(value):
@@ -151,6 +355,10 @@ class RedisDict(object):
     async def __getitem__(self, key: object) -> object:
         return self._loads((await self._redis.hget(self._prefix, self._dumps(key))))
 
+    async def get(self, key: object, default: object = None) -> object:
+        value = await self._redis.hget(self._prefix, self._dumps(key))
+        return default if value is None else self._loads(value)
+
     def __repr__(self) -> str:
         return f"<RedisDict redis={repr(self._redis)} prefix='{self._prefix}'>"
 
@@ -169,11 +377,22 @@ class RedisDict(object):
     def has_key(self, k: object) -> bool:
         return self._redis.hexists(self._prefix, self._dumps(k))
 
-    def update(self, mapping: dict):
-        return self._redis.hmset(
+    def set_many(self, mapping: dict):
+        if not mapping:
+            return asyncio.sleep(0)
+        return self._redis.hmset_dict(
             self._prefix, {self._dumps(k): self._dumps(v) for k, v in mapping.items()}
         )
 
+    update = set_many
+
+    async def get_many(self, keys: List[object]) -> List[object]:
+        if not keys:
+            return []
+        return self._loads(
+            list(await self._redis.hmget(self._prefix, *[self._dumps(k) for k in keys]))
+        )
+
     async def keys(self) -> Optional[List[object]]:
         return self._loads(list(await self._redis.hkeys(self._prefix)))
 
@@ -182,21 +401,311 @@ class RedisDict(object):
 
     async def items(self) -> List[Tuple[object]]:
         return [
-            (self._loads(key), self._loads(await self._redis.hget(self._prefix, key)))
-            for key in await self._redis.hkeys(self._prefix)
+            (self._load(key), self._load(value))
+            for key, value in (await self._redis.hgetall(self._prefix)).items()
         ]
 
-    def pop(self, index: int = 0) -> Union[str, int, bytes]:
-        key = list(self.values())[index]
-        value = self.__getitem__(key)
-        self.__delitem__(key)
-        return value
+    async def to_dict(self) -> dict:
+        return dict(await self.items())
+
+    async def pop(self, key: object, default: object = None) -> object:
+        tr = self._redis_class.multi_exec()
+        value = tr.hget(self._prefix, self._dumps(key))
+        tr.hdel(self._prefix, self._dumps(key))
+        await tr.execute()
+        value = await value
+        return default if value is None else self._loads(value)
+
+    async def aitems(self):
+        async for key, value in self._redis_class.ihscan(
+            self._prefix, count=self.scan_count
+        ):
+            yield self._load(key), self._load(value)
 
-    def __contains__(self, item: str) -> bool:
-        return self._loads(item) in self.keys()
+    async def __aiter__(self):
+        async for key, _ in self.aitems():
+            yield key
+
+    def __contains__(self, item: object) -> bool:
+        raise TypeError("use `await storage.has_key(key)` to test membership")
 
     def __iter__(self):
-        return iter(self.keys())
+        raise TypeError("use `async for key in storage` to iterate")
+
+
+class StorageCache:
+    """
+    Process-local LRU of whole storage hashes kept coherent across processes.
+
+    A hash is loaded with one HGETALL the first time it is read and served
+    from memory afterwards. Writes through :class:`CachedRedisDict` drop the
+    local copy and publish the prefix on ``CHANNEL`` so every other bot
+    process drops theirs too. Each prefix has a version counter that is
+    bumped on invalidation, so a load that raced with a write is never cached.
+    """
+
+    CHANNEL = "storage:invalidate"
+
+    def __init__(self, redis, maxsize: int = 2048):
+        self._redis = redis
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Mapping]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._listeners: List[Callable[[str], None]] = []
+        self._task = None
+        self.hits = 0
+        self.misses = 0
+
+    async def start(self, loop=None):
+        loop = loop or asyncio.get_event_loop()
+        self._task = loop.create_task(self._reader())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _reader(self):
+        while True:
+            try:
+                (channel,) = await self._redis.subscribe(self.CHANNEL)
+                async for prefix in channel.iter(encoding="utf8"):
+                    self.invalidate(prefix)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                log.warning("storage cache subscription failed: %r", exc)
+            # invalidations may have been missed while disconnected
+            self.clear()
+            await asyncio.sleep(1)
+
+    def add_listener(self, func: Callable[[str], None]):
+        """Registers ``func(prefix)`` to be called whenever a prefix is invalidated"""
+        self._listeners.append(func)
+
+    def remove_listener(self, func: Callable[[str], None]):
+        if func in self._listeners:
+            self._listeners.remove(func)
+
+    def version(self, prefix: str) -> int:
+        return self._versions.get(prefix, 0)
+
+    async def get_all(self, prefix: str) -> Mapping:
+        """
+        The decoded hash at ``prefix``. Every reader shares the one cached
+        copy, so it is returned read-only; the values inside it are shared
+        too and must not be mutated either.
+        """
+        try:
+            entry = self._entries[prefix]
+        except KeyError:
+            pass
+        else:
+            self._entries.move_to_end(prefix)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        if prefix in self._loading:
+            return await asyncio.shield(self._loading[prefix])
+
+        future = self._loading[prefix] = asyncio.get_event_loop().create_future()
+        version = self.version(prefix)
+        try:
+            raw = await self._redis.hgetall(prefix)
+            entry = MappingProxyType(
+                {
+                    RedisDict._load(key): RedisDict._load(value)
+                    for key, value in raw.items()
+                }
+            )
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # retrieved by the waiters, if any
+            raise
+        finally:
+            del self._loading[prefix]
+
+        if self.version(prefix) == version:
+            self._entries[prefix] = entry
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        future.set_result(entry)
+        return entry
+
+    def invalidate(self, prefix: str):
+        self._versions[prefix] = self.version(prefix) + 1
+        self._entries.pop(prefix, None)
+        for listener in self._listeners:
+            try:
+                listener(prefix)
+            except Exception:
+                log.exception("storage cache listener failed")
+
+    async def publish(self, prefix: str):
+        self.invalidate(prefix)
+        await self._redis.publish(self.CHANNEL, prefix)
+
+    def clear(self):
+        for prefix in list(self._entries):
+            self.invalidate(prefix)
+
+
+class CachedRedisDict(RedisDict):
+    """
+    :class:`RedisDict` whose reads are served by a :class:`StorageCache`.
+
+    Writes go straight to Redis and then invalidate the cached hash in every
+    process, so the next read reloads it.
+    """
+
+    cached = True
+
+    def __init__(self, redis, prefix, cache: StorageCache, **kwargs):
+        super().__init__(redis, prefix, **kwargs)
+        self.cache = cache
+        self._dirty = False
+
+    async def __aexit__(self, *a):
+        await super().__aexit__(*a)
+        if self._dirty:
+            self._dirty = False
+            await self.cache.publish(self._prefix)
+
+    def _written(self, reply):
+        self.cache.invalidate(self._prefix)
+        if self._redis is not self._redis_class:
+            # pipelined, published once the pipeline ran
+            self._dirty = True
+            return reply
+
+        async def publish():
+            try:
+                return await reply
+            finally:
+                await self.cache.publish(self._prefix)
+
+        return asyncio.ensure_future(publish())
+
+    async def _data(self) -> Mapping:
+        return await self.cache.get_all(self._prefix)
+
+    def __setitem__(self, key: object, value: object) -> None:
+        return self._written(super().__setitem__(key, value))
+
+    def __delitem__(self, key: object) -> None:
+        self._written(self._redis.hdel(self._prefix, self._dumps(key)))
+
+    def clear(self):
+        return self._written(super().clear())
+
+    def set_many(self, mapping: dict):
+        return self._written(super().set_many(mapping))
+
+    update = set_many
+
+    async def pop(self, key: object, default: object = None) -> object:
+        try:
+            return await super().pop(key, default)
+        finally:
+            await self.cache.publish(self._prefix)
+
+    async def __getitem__(self, key: object) -> object:
+        return (await self._data()).get(key)
+
+    async def get(self, key: object, default: object = None) -> object:
+        return (await self._data()).get(key, default)
+
+    async def __len__(self) -> int:
+        return len(await self._data())
+
+    async def has_key(self, k: object) -> bool:
+        return k in await self._data()
+
+    async def get_many(self, keys: List[object]) -> List[object]:
+        data = await self._data()
+        return [data.get(key) for key in keys]
+
+    async def keys(self) -> Optional[List[object]]:
+        return list((await self._data()).keys())
+
+    async def values(self) -> Optional[List[Tuple[object, object]]]:
+        return list((await self._data()).values())
+
+    async def items(self) -> List[Tuple[object]]:
+        return list((await self._data()).items())
+
+    async def aitems(self):
+        for item in await self.items():
+            yield item
+
+
+class RedisBatch:
+    """
+    Coalesces the Redis commands issued while handling a single message.
+
+    Every ``on_context`` listener runs as its own task, so reads queued during
+    the same event loop tick are sent together in one pipeline. Writes are
+    queued separately and flushed in a second pipeline once the listeners that
+    were woken up by the reads have queued theirs.
+
+    Both ``read`` and ``write`` return a future with the command's reply.
+    Write futures don't have to be awaited: failed writes are logged and
+    their futures marked as retrieved, so nothing is lost or left to warn.
+    """
+
+    def __init__(self, redis, loop=None):
+        self._redis = redis
+        self._loop = loop or asyncio.get_event_loop()
+        self._reads = []
+        self._writes = []
+        self.round_trips = 0
+
+    def read(self, command: str, *args, **kwargs) -> asyncio.Future:
+        return self._queue(self._reads, command, args, kwargs)
+
+    def write(self, command: str, *args, **kwargs) -> asyncio.Future:
+        return self._queue(self._writes, command, args, kwargs)
+
+    def _queue(self, queue: list, command: str, args, kwargs) -> asyncio.Future:
+        future = self._loop.create_future()
+        if not queue:
+            self._loop.call_soon(self._flush, queue)
+        queue.append((command, args, kwargs, future))
+        return future
+
+    def _flush(self, queue: list):
+        ops = queue[:]
+        queue.clear()
+        self._loop.create_task(self._execute(ops, writes=queue is self._writes))
+
+    async def _execute(self, ops: list, writes: bool = False):
+        pipe = self._redis.pipeline()
+        for command, args, kwargs, _ in ops:
+            getattr(pipe, command)(*args, **kwargs)
+
+        self.round_trips += 1
+        try:
+            results = await pipe.execute(return_exceptions=True)
+        except Exception as exc:
+            results = [exc] * len(ops)
+
+        failed = []
+        for (command, *_, future), result in zip(ops, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+                if writes:
+                    future.exception()  # retrieved, it's logged below
+                    failed.append((command, result))
+            else:
+                future.set_result(result)
+        if failed:
+            log.warning(
+                "%d batched redis writes failed, first %s: %r", len(failed), *failed[0]
+            )
 
 
 def get_storage(
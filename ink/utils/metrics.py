@@ -0,0 +1,144 @@
+import logging
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from aiohttp import web
+
+__all__ = ("Histogram", "MetricsRegistry", "MetricsServer", "format_labels")
+
+log = logging.getLogger(__name__)
+
+# upper bounds in seconds, from 10us to 1s
+LATENCY_BOUNDS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Dict[str, object]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class Histogram:
+    """
+    Fixed bucket histogram: observing a value is a bisect and an increment,
+    and memory doesn't grow with the number of observations.
+    """
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BOUNDS):
+        self.bounds = tuple(bounds)
+        # the last bucket catches everything above the highest bound
+        self.counts = array("Q", bytes(8 * (len(self.bounds) + 1)))
+        self.sum = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimated ``q`` quantile, interpolated within its bucket"""
+        total = self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                low = self.bounds[i - 1] if i else 0.0
+                high = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return low + (high - low) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+    def render(self, name: str, labels: Optional[dict] = None) -> Iterable[str]:
+        """Prometheus text exposition lines, buckets cumulative"""
+        labels = labels or {}
+        seen = 0
+        for bound, n in zip((*self.bounds, "+Inf"), self.counts):
+            seen += n
+            yield f"{name}_bucket{format_labels({**labels, 'le': bound})} {seen}"
+        yield f"{name}_sum{format_labels(labels)} {self.sum}"
+        yield f"{name}_count{format_labels(labels)} {seen}"
+
+
+class MetricsRegistry:
+    """
+    Collectors registered by cogs, each a callable returning Prometheus text
+    lines. Nothing is computed until the metrics are scraped.
+    """
+
+    def __init__(self):
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def register(self, collector: Callable[[], Iterable[str]]):
+        self._collectors.append(collector)
+
+    def unregister(self, collector: Callable[[], Iterable[str]]):
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def render(self) -> str:
+        lines = []
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as exc:
+                log.warning("metrics collector %r failed: %r", collector, exc)
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves a :class:`MetricsRegistry` at ``/metrics`` for Prometheus"""
+
+    def __init__(
+        self, registry: MetricsRegistry, host: str = "0.0.0.0", port: int = 9100
+    ):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.registry.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        log.info("serving metrics on %s:%d", self.host, self.port)
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
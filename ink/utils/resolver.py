@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import dns.asyncresolver
+import dns.exception
+import dns.name
+import dns.resolver
+
+__all__ = ("DNSResolver",)
+
+log = logging.getLogger(__name__)
+
+
+class DNSResolver:
+    """
+    Asynchronous A record lookups with a shared cache.
+
+    Answers are cached for their TTL (clamped to ``min_ttl``/``max_ttl``) and
+    names that don't exist or have no address for ``negative_ttl``. Lookups
+    that time out or fail are remembered for ``failure_ttl`` so a struggling
+    resolver isn't hammered. Concurrent lookups of one name share a single
+    query and each is bounded by ``timeout`` seconds.
+
+    ``nameservers``/``port`` replace the system resolver configuration, which
+    is what pointing the bot at a local stub resolver looks like.
+    """
+
+    def __init__(
+        self,
+        nameservers: Optional[List[str]] = None,
+        *,
+        port: int = 53,
+        timeout: float = 2.0,
+        min_ttl: int = 30,
+        max_ttl: int = 3600,
+        negative_ttl: int = 300,
+        failure_ttl: int = 10,
+        maxsize: int = 4096,
+    ):
+        self._resolver = dns.asyncresolver.Resolver(configure=not nameservers)
+        if nameservers:
+            self._resolver.nameservers = list(nameservers)
+        self._resolver.port = port
+        self._resolver.lifetime = timeout
+
+        self.timeout = timeout
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.failure_ttl = failure_ttl
+        self.maxsize = maxsize
+
+        # name -> (expires, addresses), least recently used first
+        self._cache: "OrderedDict[str, Tuple[float, Tuple[str, ...]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<DNSResolver nameservers={self._resolver.nameservers!r} "
+            f"cached={len(self._cache)} hits={self.hits} misses={self.misses}>"
+        )
+
+    @staticmethod
+    def normalize(host: str) -> str:
+        # netlocs may carry credentials and a port
+        host = host.rpartition("@")[2]
+        if host.startswith("["):
+            return host[1 : host.find("]")]
+        return host.split(":", 1)[0].rstrip(".").lower()
+
+    async def resolves(self, host: str) -> bool:
+        return bool(await self.resolve(host))
+
+    async def resolve(self, host: str) -> Tuple[str, ...]:
+        """Returns the addresses of ``host``, or an empty tuple if it has none"""
+        name = self.normalize(host)
+        if not name:
+            return ()
+
+        entry = self._cache.get(name)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._cache.move_to_end(name)
+                self.hits += 1
+                return entry[1]
+            del self._cache[name]
+
+        task = self._inflight.get(name)
+        if task is None:
+            self.misses += 1
+            task = self._inflight[name] = asyncio.ensure_future(self._lookup(name))
+        # one cancelled caller must not cancel the lookup for the others
+        return await asyncio.shield(task)
+
+    async def _lookup(self, name: str) -> Tuple[str, ...]:
+        try:
+            addresses, ttl = await self._query(name)
+            self._store(name, addresses, ttl)
+            return addresses
+        finally:
+            del self._inflight[name]
+
+    async def _query(self, name: str) -> Tuple[Tuple[str, ...], float]:
+        try:
+            answer = await asyncio.wait_for(
+                self._resolver.resolve(name, "A"), self.timeout
+            )
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return (), self.negative_ttl
+        except (dns.name.EmptyLabel, dns.name.LabelTooLong, dns.name.NameTooLong):
+            return (), self.negative_ttl
+        except (asyncio.TimeoutError, dns.exception.DNSException) as exc:
+            log.debug("lookup of %s failed: %r", name, exc)
+            return (), self.failure_ttl
+
+        ttl = min(max(answer.rrset.ttl, self.min_ttl), self.max_ttl)
+        return tuple(rr.address for rr in answer), ttl
+
+    def _store(self, name: str, addresses: Tuple[str, ...], ttl: float):
+        self._cache[name] = (time.monotonic() + ttl, addresses)
+        self._cache.move_to_end(name)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def clear(self):
+        self._cache.clear()
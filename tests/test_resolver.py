@@ -0,0 +1,192 @@
+import asyncio
+import time
+import types
+from collections import Counter
+
+import dns.message
+import dns.rcode
+import dns.rdata
+import dns.rdataclass
+import dns.rdatatype
+import pytest
+
+from ink.utils import resolver as resolver_module
+from ink.utils.resolver import DNSResolver
+
+RECORDS = {
+    "example.test.": (("192.0.2.1", "192.0.2.2"), 120),
+    "short.test.": (("192.0.2.3",), 5),
+    "long.test.": (("192.0.2.4",), 999999),
+}
+ADDRESSES = sorted(RECORDS["example.test."][0])
+
+
+class StubNameserver(asyncio.DatagramProtocol):
+    """
+    Answers A queries for ``RECORDS`` over UDP on localhost, NXDOMAIN for
+    anything else under ``.test`` and nothing at all for ``.drop`` names.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.queries = Counter()
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        query = dns.message.from_wire(data)
+        name = query.question[0].name.to_text()
+        self.queries[name] += 1
+        if name.endswith(".drop."):
+            return
+
+        response = dns.message.make_response(query)
+        if name in RECORDS:
+            addresses, ttl = RECORDS[name]
+            rrset = response.find_rrset(
+                response.answer,
+                query.question[0].name,
+                dns.rdataclass.IN,
+                dns.rdatatype.A,
+                create=True,
+            )
+            for address in addresses:
+                rrset.add(
+                    dns.rdata.from_text(dns.rdataclass.IN, dns.rdatatype.A, address),
+                    ttl,
+                )
+        else:
+            response.set_rcode(dns.rcode.NXDOMAIN)
+
+        wire = response.to_wire()
+        if self.delay:
+            asyncio.get_running_loop().call_later(
+                self.delay, self.transport.sendto, wire, addr
+            )
+        else:
+            self.transport.sendto(wire, addr)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # only the cache's clock, dnspython keeps timing its queries for real
+    clock = Clock()
+    monkeypatch.setattr(
+        resolver_module, "time", types.SimpleNamespace(monotonic=clock.monotonic)
+    )
+    return clock
+
+
+def run(test, delay: float = 0.0, **kwargs):
+    async def main():
+        loop = asyncio.get_running_loop()
+        transport, stub = await loop.create_datagram_endpoint(
+            lambda: StubNameserver(delay), local_addr=("127.0.0.1", 0)
+        )
+        port = transport.get_extra_info("sockname")[1]
+        try:
+            await test(DNSResolver(["127.0.0.1"], port=port, **kwargs), stub)
+        finally:
+            transport.close()
+
+    asyncio.run(main())
+
+
+def test_positive_answers_are_cached_for_their_ttl(clock):
+    async def test(resolver, stub):
+        assert sorted(await resolver.resolve("Example.TEST")) == ADDRESSES
+        clock.now += 119
+        assert await resolver.resolve("user@example.test:443")
+        assert stub.queries["example.test."] == 1
+        assert (resolver.hits, resolver.misses) == (1, 1)
+
+        clock.now += 2
+        assert await resolver.resolves("example.test")
+        assert stub.queries["example.test."] == 2
+
+    run(test)
+
+
+def test_ttls_are_clamped(clock):
+    async def test(resolver, stub):
+        await resolver.resolve("short.test")
+        await resolver.resolve("long.test")
+        clock.now += 29
+        await resolver.resolve("short.test")
+        assert stub.queries["short.test."] == 1
+        clock.now += 2
+        await resolver.resolve("short.test")
+        assert stub.queries["short.test."] == 2
+
+        clock.now += 3600
+        await resolver.resolve("long.test")
+        assert stub.queries["long.test."] == 2
+
+    run(test, min_ttl=30, max_ttl=3600)
+
+
+def test_missing_names_are_cached_negatively(clock):
+    async def test(resolver, stub):
+        assert await resolver.resolve("missing.test") == ()
+        clock.now += 299
+        assert not await resolver.resolves("missing.test")
+        assert stub.queries["missing.test."] == 1
+
+        clock.now += 2
+        await resolver.resolve("missing.test")
+        assert stub.queries["missing.test."] == 2
+
+    run(test, negative_ttl=300)
+
+
+def test_concurrent_lookups_share_one_query(clock):
+    async def test(resolver, stub):
+        results = await asyncio.gather(
+            *[resolver.resolve("example.test") for _ in range(20)]
+        )
+        assert all(sorted(result) == ADDRESSES for result in results)
+        assert stub.queries["example.test."] == 1
+        assert resolver.misses == 1
+
+    run(test, delay=0.05)
+
+
+def test_cancelled_caller_does_not_cancel_the_lookup(clock):
+    async def test(resolver, stub):
+        first = asyncio.ensure_future(resolver.resolve("example.test"))
+        second = asyncio.ensure_future(resolver.resolve("example.test"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert sorted(await second) == ADDRESSES
+        assert stub.queries["example.test."] == 1
+
+    run(test, delay=0.05)
+
+
+def test_timeouts_are_bounded_and_remembered(clock):
+    async def test(resolver, stub):
+        start = time.perf_counter()
+        assert await resolver.resolve("slow.drop") == ()
+        assert time.perf_counter() - start < 1.0
+        queries = stub.queries["slow.drop."]
+        assert queries >= 1
+
+        clock.now += 9
+        assert await resolver.resolve("slow.drop") == ()
+        assert stub.queries["slow.drop."] == queries
+
+        clock.now += 2
+        await resolver.resolve("slow.drop")
+        assert stub.queries["slow.drop."] > queries
+
+    run(test, timeout=0.2, failure_ttl=10)